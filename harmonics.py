@@ -34,22 +34,92 @@ TABLE OF CONTENTS:
   - note_number
   - note_name
   - ordinal_string
+  - Notation
+  - current_notation
+  - use_notation
+  - LRUCache
+  - memoized
+  - cache_info
+  - clear_caches
+  - set_cache_size
+  - build_key
+  - is_built
+  - record_build
 
 - Computation
 
+  - CentsTable
+  - cents_table
+  - EqualTemperament
+  - equal_temperament
+  - Scale
+  - parse_scale
+  - load_scale
+  - as_tuning
   - note_positions_near_harmonic
   - harmonic_interval
+  - harmonic_nodes
+  - tuning_tables
+  - compare_tunings
+  - farey_nodes
+  - note_positions_in_range
+  - NodeIndex
+  - node_index
+  - simplest_node
+  - simplest_nodes
+  - HarmonicNode
+  - HarmonicTable
+  - iter_nodes
+  - totients
+  - parallel_harmonic_table
+
+- Storage
+
+  - write_harmonic_table
+  - HarmonicTableFile
+  - export_harmonics
 
 - Output
 
+  - harmonics_lines
   - print_harmonics
+  - format_harmonics
+  - harmonics_by_position_lines
   - print_harmonics_by_position
+  - format_harmonics_by_position
+  - LilypondWriter
   - lilypond_harmonics
+  - lilypond_document
+  - HarmonicModel
+  - register_renderer
+  - render
+  - render_strings
+  - compile_lilypond
+  - merge_pdfs
   - lilypond_cello_strings
 
 """
 
 from math import log, gcd, floor
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict, namedtuple
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from decimal import Decimal, localcontext
+from fractions import Fraction
+from copy import copy
+from functools import wraps
+from itertools import compress, islice, repeat
+from threading import Lock
+import csv
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import sys
 
 ################################################################################
 ################################  Global Data  #################################
@@ -60,6 +130,11 @@ note_nums =  {'C':0, 'D':2, 'E':4, 'F':5, 'G':7, 'A':9, 'B':11}
 note_names = {num:name for name,num in note_nums.items()}
 flat_symbol = 'f'
 sharp_symbol = 's'
+cache_size = 4096               # default bound on entries in each memo cache
+index_cache_size = 4            # initial bound on cached ``node_index`` results;
+                                # change with set_cache_size(k, 'node_index')
+lilypond_command = 'lilypond'   # programs run to build PDF charts
+pdftk_command = 'pdftk'
 
 
 ################################################################################
@@ -100,15 +175,120 @@ def ordinal(n):
   return str(n1) + suf
 
 
-def note_number(S):
+class Notation:
+  """.
+  Immutable spelling of note names, with its lookup tables precomputed.
+
+  INPUT:
+
+  - ``flat`` -- string (default: ``flat_symbol``); the suffix indicating a flat
+
+  - ``sharp`` -- string (default: ``sharp_symbol``); the suffix indicating a
+    sharp
+
+  The notation in effect is given by ``current_notation``, and can be changed
+  for a block of code, in the current thread or asynchronous task only, with
+  ``use_notation``.  ``note_number`` and ``note_name``, and so all output
+  functions, use the notation in effect unless given one explicitly.
+
+  EXAMPLES:
+
+    >>> N = Notation(flat='es', sharp='is')
+    >>> N.number('fis'), N.name(10, lower_case=True, prefer_flat=True)
+    (6, 'bes')
+    >>> with use_notation(Notation('\u266d', '\u266f')):
+    ...     print(note_name(1), note_number('E\u266d'))
+    C♯ 3
+
+  """
+
+  __slots__ = ('flat', 'sharp', '_numbers', '_names')
+
+  def __init__(self, flat=None, sharp=None):
+    flat = flat_symbol if flat is None else flat
+    sharp = sharp_symbol if sharp is None else sharp
+    numbers = {}
+    for name,num in note_nums.items():
+      for letter in (name, name.lower()):
+        numbers[letter] = num
+        numbers[letter + sharp] = num + 1
+        numbers[letter + flat] = num - 1
+    names = {}
+    for lower_case in (False, True):
+      for prefer_flat in (False, True):
+        table = []
+        for n in range(12):
+          S = note_names.get(n)
+          if S is None:
+            S = note_names[(n+1) % 12] + flat if prefer_flat else note_names[(n-1) % 12] + sharp
+          table.append(S.lower() if lower_case else S)
+        names[lower_case, prefer_flat] = tuple(table)
+    object.__setattr__(self, 'flat', flat)
+    object.__setattr__(self, 'sharp', sharp)
+    object.__setattr__(self, '_numbers', numbers)
+    object.__setattr__(self, '_names', names)
+
+  def __setattr__(self, name, value):
+    raise AttributeError('Notation objects are immutable')
+
+  def __repr__(self):
+    return 'Notation(flat={!r}, sharp={!r})'.format(self.flat, self.sharp)
+
+  def number(self, S):
+    """
+    Return the note number specified by ``S``, as for ``note_number``.
+    """
+    n = self._numbers.get(S)
+    if n is None:
+      if S[:1].upper() not in note_nums:
+        raise KeyError('unknown note name {}'.format(S))
+      raise ValueError('unknown accidental {}'.format(S[1:]))
+    return n
+
+  def name(self, n, lower_case=False, prefer_flat=False):
+    """
+    Return the name of the note numbered ``n``, as for ``note_name``.
+    """
+    return self._names[bool(lower_case), bool(prefer_flat)][n % 12]
+
+
+DEFAULT_NOTATION = Notation()
+_notation = ContextVar('notation', default=DEFAULT_NOTATION)
+
+def current_notation():
+  """
+  Return the ``Notation`` in effect in the current context.
+  """
+  return _notation.get()
+
+
+@contextmanager
+def use_notation(notation):
+  """
+  Context manager putting the ``Notation`` ``notation`` into effect for the
+  current thread or task within its block.
+  """
+  token = _notation.set(notation)
+  try:
+    yield notation
+  finally:
+    _notation.reset(token)
+
+#############################  Utility Functions  ##############################
+
+def note_number(S, notation=None):
   """
   Return the note number specified by S
   
   INPUT:
 
   - ``S`` -- a string representing a note in the chromatic scale, with
-    accidentals indicated by a following instance of ``flat_symbol`` or
-    ``sharp_symbol`` (probably "f" or "s" respectively).
+    accidentals indicated by a following instance of the flat or sharp symbol
+    of the notation (by default ``flat_symbol`` or ``sharp_symbol``, "f" or "s"
+    respectively).
+
+  - ``notation`` -- optional ``Notation``; by default, the notation in effect
+    (see ``current_notation``)
 
   OUTPUT:
 
@@ -122,21 +302,13 @@ def note_number(S):
     10
 
   """
-  name = S[0].upper()
-  n = note_nums[name]
-  if len(S) > 1:
-    acc = S[1]
-    if acc == sharp_symbol:
-      n +=1
-    elif acc == flat_symbol:
-      n -= 1
-    else:
-      raise ValueError('unknown accidental {}'.format(acc))
-  return n
+  if notation is None:
+    notation = _notation.get()
+  return notation.number(S)
 
 #############################  Utility Functions  ##############################
 
-def note_name(n, lower_case=False, prefer_flat=False):
+def note_name(n, lower_case=False, prefer_flat=False, notation=None):
   """.
 
   Return the name of note with scale degree ``n`` in chromatic scale based on C
@@ -148,10 +320,14 @@ def note_name(n, lower_case=False, prefer_flat=False):
   - ``lower`` -- boolean (default: False); whether to return the note name in
     lower rather than upper case
 
+  - ``notation`` -- optional ``Notation``; by default, the notation in effect
+    (see ``current_notation``)
+
   OUTPUT:
 
-  - a one- or two-character string representing the note, with sharp or flat
-    indicated by ``sharp_symbol`` or ``flat_symbol`` as second character.
+  - a string representing the note, with sharp or flat indicated by the sharp
+    or flat symbol of the notation (by default ``sharp_symbol`` or
+    ``flat_symbol``) following the letter.
     Sharps will be used rather than the enharmonic flat, unles ``prefer_flat``
     is True.
 
@@ -165,20 +341,217 @@ def note_name(n, lower_case=False, prefer_flat=False):
     Af
 
   """
-  m = n % 12
-  S = note_names.get(m)
-  if S is not None:
-    return S.lower() if lower_case else S
-  if prefer_flat:
-    m = (n+1) % 12
-    acc = flat_symbol
-  else:
-    m = (n-1) % 12
-    acc = sharp_symbol
-  S = note_names.get(m)
-  if S is None:
-    raise ValueError('no known note numbered {}'.format(m))
-  return (S.lower() if lower_case else S) + acc
+  if notation is None:
+    notation = _notation.get()
+  return notation.name(n, lower_case, prefer_flat)
+
+#############################  Utility Functions  ##############################
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+class LRUCache:
+  """
+  Mapping of bounded size that discards its least recently used entries.
+
+  INPUT:
+
+  - ``maxsize`` -- positive integer (default: ``cache_size``); the largest
+    number of entries to keep; may be changed later with ``resize``
+
+  EXAMPLES:
+
+    >>> C = LRUCache(2)
+    >>> C.put(1, 'a'); C.put(2, 'b'); C.get(1); C.put(3, 'c')
+    'a'
+    >>> C.get(2, 'missing')
+    'missing'
+    >>> C.info()
+    CacheInfo(hits=1, misses=1, maxsize=2, currsize=2)
+
+  """
+
+  def __init__(self, maxsize=None):
+    self.maxsize = cache_size if maxsize is None else maxsize
+    self.hits = 0
+    self.misses = 0
+    self._data = OrderedDict()
+    self._lock = Lock()
+
+  def get(self, key, default=None):
+    with self._lock:
+      try:
+        value = self._data[key]
+      except KeyError:
+        self.misses += 1
+        return default
+      self._data.move_to_end(key)
+      self.hits += 1
+      return value
+
+  def put(self, key, value):
+    with self._lock:
+      self._data[key] = value
+      self._data.move_to_end(key)
+      while len(self._data) > self.maxsize:
+        self._data.popitem(last=False)
+
+  def peek(self, key, default=None):
+    """
+    Return the value for ``key``, or ``default``, without counting a hit or
+    miss or marking the entry as recently used.
+    """
+    with self._lock:
+      return self._data.get(key, default)
+
+  def resize(self, maxsize):
+    with self._lock:
+      self.maxsize = maxsize
+      while len(self._data) > maxsize:
+        self._data.popitem(last=False)
+
+  def clear(self):
+    with self._lock:
+      self._data.clear()
+      self.hits = self.misses = 0
+
+  def info(self):
+    return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+_caches = {}
+_fixed_caches = set()
+_missing = object()
+_kwd_mark = object()    # separates positional from keyword arguments in keys
+
+def memoized(f=None, maxsize=None):
+  """
+  Decorator caching the results of a pure function of hashable arguments in an
+  ``LRUCache``, which is available as the ``cache`` attribute of the decorated
+  function and is registered for ``cache_info``, ``clear_caches`` and
+  ``set_cache_size``.  Used as ``memoized(maxsize=k)``, the cache keeps at most
+  ``k`` entries whatever ``set_cache_size`` is given, for functions whose
+  results are large.
+  """
+  if f is None:
+    return lambda f: memoized(f, maxsize)
+  cache = LRUCache(maxsize)
+  @wraps(f)
+  def wrapper(*args, **kwargs):
+    key = args + (_kwd_mark,) + tuple(sorted(kwargs.items())) if kwargs else args
+    value = cache.get(key, _missing)
+    if value is _missing:
+      value = f(*args, **kwargs)
+      cache.put(key, value)
+    return value
+  wrapper.cache = cache
+  name = f.__name__.lstrip('_')
+  _caches[name] = cache
+  if maxsize is not None:
+    _fixed_caches.add(name)
+  return wrapper
+
+
+def cache_info():
+  """
+  Return a dictionary mapping the name of each memoized function to the
+  ``CacheInfo`` (hits, misses, maxsize, currsize) of its cache.
+  """
+  return {name:cache.info() for name,cache in _caches.items()}
+
+
+def clear_caches():
+  """
+  Empty all memo caches and reset their hit and miss counters.
+  """
+  for cache in _caches.values():
+    cache.clear()
+
+
+def set_cache_size(maxsize, name=None):
+  """
+  Set the bound on the number of entries of every memo cache to ``maxsize``,
+  discarding least recently used entries as needed.  Caches given their own
+  bound by ``memoized(maxsize=k)`` are left as they are.  If ``name`` is
+  given, only the cache of that name, as in ``cache_info``, is resized,
+  whether or not it has its own bound.
+
+  EXAMPLES:
+
+    >>> set_cache_size(2, 'node_index')
+    >>> cache_info()['node_index'].maxsize
+    2
+    >>> set_cache_size(index_cache_size, 'node_index')
+
+  """
+  if name is not None:
+    try:
+      cache = _caches[name]
+    except KeyError:
+      raise ValueError('no memo cache named {}'.format(name))
+    cache.resize(maxsize)
+    return
+  global cache_size
+  cache_size = maxsize
+  for name, cache in _caches.items():
+    if name not in _fixed_caches:
+      cache.resize(maxsize)
+
+#############################  Utility Functions  ##############################
+
+@memoized
+def _module_hash():
+  with open(__file__, 'rb') as F:
+    return hashlib.sha256(F.read()).hexdigest()
+
+def _text_hash(text):
+  return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def _file_hash(filename):
+  try:
+    with open(filename, 'rb') as F:
+      return hashlib.sha256(F.read()).hexdigest()
+  except FileNotFoundError:
+    return None
+
+
+def build_key(**params):
+  """
+  Return a hash identifying a build product by the parameters ``params`` used
+  to produce it and the source of this module, so that any change to either
+  gives a new key.  The parameters must be representable in JSON.
+
+  EXAMPLES:
+
+    >>> build_key(string=('a',0), octave=1) == build_key(octave=1, string=['a',0])
+    True
+    >>> build_key(octave=1) == build_key(octave=2)
+    False
+
+  """
+  data = json.dumps(params, sort_keys=True)
+  return _text_hash(_module_hash() + data)
+
+
+def is_built(filename, key):
+  """
+  Return True if the file ``filename`` exists and was last built with build
+  key ``key``, as recorded by ``record_build``.
+  """
+  try:
+    with open(filename + '.key') as F:
+      recorded = F.read().strip()
+  except FileNotFoundError:
+    return False
+  return recorded == key and os.path.exists(filename)
+
+
+def record_build(filename, key):
+  """
+  Record that the file ``filename`` has been built with build key ``key``;
+  the key is kept in a file named ``filename`` with ".key" appended.
+  """
+  with open(filename + '.key', 'w') as F:
+    F.write(key + '\n')
 
 
 
@@ -186,8 +559,386 @@ def note_name(n, lower_case=False, prefer_flat=False):
 ################################  Computation  #################################
 ################################################################################
 
+CENT_UNITS = 10**9              # fixed-point units per cent in a CentsTable
+_STEP = 100*CENT_UNITS          # units per tempered half step
+
+class CentsTable:
+  """.
+  Table of exact fixed-point logarithms, in cents, of the integers up to a bound.
+
+  INPUT:
+
+  - ``N`` -- positive integer; largest integer in the table; the table is
+    extended as needed by ``extend``
+
+  The size in cents of the interval from 1 to ``k``, i.e. ``1200*log2(k)``, is
+  kept as the integer ``self[k]`` in units of ``1/CENT_UNITS`` cent.  A sieve
+  finds the smallest prime factor ``p`` of each ``k``, and ``self[k]`` is
+  ``self[k//p] + self[p]``; only the logarithms of the primes are computed, in
+  decimal arithmetic, so the table is the same on every platform.  The size of
+  the ratio ``h/m`` is then ``self[h] - self[m]``, with no floating point
+  calls.  The values are within ``log2(k)/CENT_UNITS`` cents of exact.
+
+  EXAMPLES:
+
+    >>> T = CentsTable(10)
+    >>> T[8] == 3 * T[2] == 3600 * CENT_UNITS
+    True
+    >>> T.millicents(3)
+    1901955
+    >>> T.ratio(3, 2) / CENT_UNITS
+    701.955000865
+
+  """
+
+  def __init__(self, N):
+    self._spf = array('l', [0, 1])
+    self._cents = array('q', [0, 0])
+    self._lock = Lock()
+    self.extend(N)
+
+  def __len__(self):
+    return len(self._cents)
+
+  def __getitem__(self, k):
+    return self._cents[k]
+
+  def extend(self, N):
+    """
+    Extend the table to include all integers up to ``N``.
+    """
+    with self._lock:
+      M = len(self._cents) - 1
+      if N <= M:
+        return
+      spf = self._spf
+      spf.extend(range(M+1, N+1))
+      for p in range(2, floor(N**0.5) + 1):
+        if spf[p] != p:
+          continue
+        for k in range(max(p*p, (M//p + 1)*p), N+1, p):
+          if spf[k] == k:
+            spf[k] = p
+      cents = self._cents
+      with localcontext() as context:
+        context.prec = 40
+        octave = Decimal(2).ln() / (1200*CENT_UNITS)
+        for k in range(M+1, N+1):
+          p = spf[k]
+          if p == k:
+            cents.append(int((Decimal(k).ln() / octave).to_integral_value()))
+          else:
+            cents.append(cents[k//p] + cents[p])
+
+  def tolist(self, N):
+    """
+    Return the list of the values of the table for ``0, 1, ..., N``.
+    """
+    return self._cents[:N+1].tolist()
+
+  def ratio(self, h, m):
+    """
+    Return the size of the interval ``h/m`` in units of ``1/CENT_UNITS`` cent.
+    """
+    return self._cents[h] - self._cents[m]
+
+  def primes(self, k):
+    """
+    Return the list of the distinct prime factors of ``k``, in increasing
+    order, read from the sieve.
+    """
+    spf = self._spf
+    primes = []
+    while k > 1:
+      p = spf[k]
+      primes.append(p)
+      while k % p == 0:
+        k //= p
+    return primes
+
+  def coprimes(self, h):
+    """
+    Return the list of the integers ``m`` with ``0 < m < h`` and ``gcd(m,h) ==
+    1``, in decreasing order; these are the numerators of the nodes of harmonic
+    ``h``, from nut to bridge.  They are sieved with slice assignments over the
+    prime factors of ``h`` rather than tested one by one.
+    """
+    mask = bytearray([1]) * h
+    if h:
+      mask[0] = 0
+    for p in self.primes(h):
+      mask[::p] = bytes(len(range(0, h, p)))
+    ms = list(compress(range(h), mask))
+    ms.reverse()
+    return ms
+
+  def millicents(self, k):
+    """
+    Return the size in cents of the interval from 1 to ``k``, rounded to an
+    integer number of thousandths of a cent.
+    """
+    units = CENT_UNITS // 1000
+    return (2*self._cents[k] + units) // (2*units)
+
+
+_cents_table = CentsTable(64)
+
+def cents_table(N):
+  """
+  Return the shared ``CentsTable``, extended to include ``N`` if needed.
+  """
+  if N >= len(_cents_table):
+    _cents_table.extend(N)
+  return _cents_table
+
+
+def _nearest_note(c):
+  # the nearest tempered note n to the fixed-point interval c, and the offset in
+  # cents from n to c; exact halves cannot occur for ratios of integers
+  n = (2*c + _STEP) // (2*_STEP)
+  return n, (2*(c - n*_STEP) + CENT_UNITS) // (2*CENT_UNITS)
+
+################################  Computation  #################################
+
+class EqualTemperament:
+  """.
+  Equal division of the octave into a given number of steps.
+
+  INPUT:
+
+  - ``divisions`` -- positive integer; the number of steps per octave, e.g. 12
+    for the usual tempered tuning, or 19, 24, 31, 53
+
+  Use ``equal_temperament`` to get the shared instance for a number of
+  divisions, whose constants and name tables are computed only once.  The
+  functions that accept a ``tuning`` argument (``note_positions_near_harmonic``,
+  ``harmonic_interval``, ``tuning_tables``) accept such an object, or just the
+  number of divisions.
+
+  EXAMPLES:
+
+    >>> T = equal_temperament(24)
+    >>> T.nearest(cents_table(3).ratio(3, 2))
+    (14, 2)
+    >>> T.names()[:4]
+    ('C', 'C+50', 'Cs', 'D-50')
+    >>> equal_temperament(19).names()[:4]
+    ('C', 'Cs-37', 'Cs+26', 'D-11')
+
+  """
+
+  def __init__(self, divisions):
+    if divisions < 1:
+      raise ValueError('number of divisions must be positive')
+    self.divisions = divisions
+    self.steps = divisions      # steps per octave
+    self._octave = 1200*CENT_UNITS
+    self._names = {}
+
+  def __repr__(self):
+    return 'EqualTemperament({})'.format(self.divisions)
+
+  def cents(self, k):
+    """
+    Return the size in cents of ``k`` steps, as a float.
+    """
+    return 1200 * k / self.divisions
+
+  def nearest(self, c):
+    """
+    Return the pair ``(n,e)`` of the step ``n`` nearest the interval ``c``,
+    given in units of ``1/CENT_UNITS`` cent as by ``CentsTable``, and the offset
+    ``e`` in cents, rounded to an integer, from step ``n`` to ``c``.
+    """
+    d, octave = self.divisions, self._octave
+    n = (2*c*d + octave) // (2*octave)
+    return n, (2*(c*d - n*octave) + d*CENT_UNITS) // (2*d*CENT_UNITS)
+
+  def names(self, notation=None):
+    """
+    Return the tuple of names of the steps of one octave above C.  A step is
+    named by the nearest note of the 12 tone scale, followed by its offset in
+    cents from that note unless it is 0.  The names use ``notation``, by
+    default the one in effect, and are computed once per notation.
+    """
+    if notation is None:
+      notation = current_notation()
+    names = self._names.get(notation)
+    if names is None:
+      steps = [1200 * k / self.divisions for k in range(self.divisions)]
+      names = self._names[notation] = _step_names(steps, notation)
+    return names
+
+
+def _step_names(steps, notation):
+  # name each step, given in cents above C, by the nearest note of the 12 tone
+  # scale and its offset in cents from it, if not 0
+  names = []
+  for c in steps:
+    n = int(round(c / 100))
+    e = int(round(c - 100*n))
+    name = notation.name(n)
+    names.append(name if e == 0 else '{}{:+d}'.format(name, e))
+  return tuple(names)
+
+
+@memoized
+def equal_temperament(divisions):
+  """
+  Return the shared ``EqualTemperament`` with ``divisions`` steps per octave.
+  """
+  return EqualTemperament(divisions)
+
 
-def note_positions_near_harmonic(h):
+class Scale:
+  """.
+  Scale of arbitrary pitches repeating at a given period, as in a Scala file.
+
+  INPUT:
+
+  - ``description`` -- string; a one-line description of the scale
+
+  - ``pitches`` -- list of strings, the pitch lines of a Scala file: each a
+    number of cents containing a '.', or a ratio ``a/b``, or an integer ``a``
+    meaning ``a/1``.  The pitches are of the degrees above the unison; the
+    last is the period at which the scale repeats (usually ``2/1``).
+
+  The degrees within one period are compiled once into a sorted array of
+  fixed-point sizes, in the units of ``CentsTable``, so ``nearest`` is a
+  binary search.  Steps are numbered upwards from 0 at the unison, and
+  ``steps`` per period; a scale can be passed as the ``tuning`` of
+  ``note_positions_near_harmonic`` and ``harmonic_interval``, in which case the
+  octave they give is the number of periods.  Use ``load_scale`` to read a
+  Scala file.
+
+  EXAMPLES:
+
+    >>> S = Scale('Pythagorean pentatonic', ['9/8', '81/64', '3/2', '27/16', '2/1'])
+    >>> S.steps, [round(c, 3) for c in S.cents()]
+    (5, [0.0, 203.91, 407.82, 701.955, 905.865])
+    >>> note_positions_near_harmonic(3, tuning=S)
+    [(3, 0), (8, 0)]
+    >>> harmonic_interval(5, tuning=S)
+    (2, 2, -22)
+
+  """
+
+  def __init__(self, description, pitches):
+    self.description = description
+    if not pitches:
+      raise ValueError('a scale must have at least one pitch')
+    sizes = [_pitch_units(p) for p in pitches]
+    self.period = sizes[-1]
+    if self.period <= 0:
+      raise ValueError('the period of a scale must be positive')
+    self._degrees = array('q', sorted(set([0] + [c % self.period for c in sizes[:-1]])))
+    self.steps = len(self._degrees)
+    self._names = {}
+
+  def __repr__(self):
+    return 'Scale({!r})'.format(self.description)
+
+  def cents(self):
+    """
+    Return the list of sizes in cents, as floats, of the degrees of one period.
+    """
+    return [c / CENT_UNITS for c in self._degrees]
+
+  def nearest(self, c):
+    """
+    Return the pair ``(n,e)`` of the step ``n`` nearest the interval ``c``,
+    given in units of ``1/CENT_UNITS`` cent as by ``CentsTable``, and the offset
+    ``e`` in cents, rounded to an integer, from step ``n`` to ``c``.
+    """
+    q, r = divmod(c, self.period)
+    degrees = self._degrees
+    i = bisect_right(degrees, r)
+    below = degrees[i-1]
+    above = degrees[i] if i < len(degrees) else self.period
+    if above - r < r - below:
+      n, d = i, r - above
+    else:
+      n, d = i-1, r - below
+    return q*self.steps + n, (2*d + CENT_UNITS) // (2*CENT_UNITS)
+
+  def names(self, notation=None):
+    """
+    Return the tuple of names of the degrees of one period above C, named as
+    by ``EqualTemperament.names``.
+    """
+    if notation is None:
+      notation = current_notation()
+    names = self._names.get(notation)
+    if names is None:
+      names = self._names[notation] = _step_names(self.cents(), notation)
+    return names
+
+
+def _pitch_units(pitch):
+  # the size of a Scala pitch line, in units of 1/CENT_UNITS cent
+  with localcontext() as context:
+    context.prec = 40
+    if '.' in pitch:
+      return int((Decimal(pitch) * CENT_UNITS).to_integral_value())
+    a, _, b = pitch.partition('/')
+    ratio = Decimal(int(a)) / Decimal(int(b or 1))
+    if ratio <= 0:
+      raise ValueError('invalid pitch {}'.format(pitch))
+    return int((ratio.ln() / Decimal(2).ln() * 1200 * CENT_UNITS).to_integral_value())
+
+
+def parse_scale(text):
+  """
+  Return the ``Scale`` described by ``text``, the contents of a Scala ``.scl``
+  file, raising a ``ValueError`` if it is malformed.
+  """
+  lines = [line.strip() for line in text.splitlines() if not line.startswith('!')]
+  if len(lines) < 2:
+    raise ValueError('incomplete Scala scale')
+  description = lines[0]
+  try:
+    count = int(lines[1].split()[0])
+    pitches = [line.split()[0] for line in lines[2:2+count]]
+    if len(pitches) != count:
+      raise ValueError
+    return Scale(description, pitches)
+  except (ValueError, IndexError, ArithmeticError):
+    raise ValueError('malformed Scala scale {!r}'.format(description))
+
+
+_scales = LRUCache()
+_caches['load_scale'] = _scales
+
+def load_scale(filename):
+  """
+  Return the ``Scale`` in the Scala file ``filename``.  Scales are cached by a
+  hash of the file contents, so loading an unchanged file again returns the
+  same object without parsing it.
+  """
+  with open(filename, 'rb') as F:
+    data = F.read()
+  digest = hashlib.sha256(data).hexdigest()
+  scale = _scales.get(digest)
+  if scale is None:
+    scale = parse_scale(data.decode('utf-8', errors='replace'))
+    _scales.put(digest, scale)
+  return scale
+
+
+def as_tuning(tuning):
+  """
+  Return the tuning object given by ``tuning``: an integer number of equal
+  divisions of the octave is converted by ``equal_temperament``, and any other
+  tuning is returned unchanged.
+  """
+  if isinstance(tuning, int):
+    return equal_temperament(tuning)
+  return tuning
+
+################################  Computation  #################################
+
+
+def note_positions_near_harmonic(h, tuning=None):
   """.
   Return the note numbers and offset of the fingered notes nearest the each node
   of given harmonic.
@@ -196,6 +947,10 @@ def note_positions_near_harmonic(h):
 
   - ``h`` -- positive integer; the harmonic number
 
+  - ``tuning`` -- optional tuning, e.g. an ``EqualTemperament`` or a number of
+    equal divisions of the octave (default: 12); the fingered notes are the
+    steps of this tuning, and ``n`` counts steps rather than half steps
+
   OUTPUT:
 
   - ordered list of pairs ``(n,e)``, one for each of the ``h-1`` nodes of the harmonic, where
@@ -220,78 +975,1139 @@ def note_positions_near_harmonic(h):
     [(7, 2), (19, 2)]
     >>> note_positions_near_harmonic(4)
     [(5, -2), (24, 0)]
+    >>> note_positions_near_harmonic(4, tuning=31)
+    [(13, -5), (62, 0)]
+
+  """
+  if tuning is not None:
+    tuning = as_tuning(tuning)
+  return list(_note_positions_near_harmonic(h, tuning))
+
+@memoized
+def _note_positions_near_harmonic(h, tuning):
+  if h < 0:
+    raise TypeError('argument must be a positive integer')
+  nearest = _nearest_note if tuning is None else tuning.nearest
+  cents = cents_table(h)
+  notes = []
+  for m in range(1,h):
+    if gcd(m,h) > 1: continue
+    notes.append(nearest(cents[h] - cents[m]))
+  notes.reverse()
+  return tuple(notes)
+
+################################  Computation  #################################
+
+@memoized
+def harmonic_interval(h, tuning=None):
+  """Return the chromatic interval, octave, and offset of a harmonic.
+
+  INPUT:
+
+  - ``h`` -- positive integer; the harmonic number
+
+  - ``tuning`` -- optional tuning, as for ``note_positions_near_harmonic``; if
+    given, ``num`` counts steps of the tuning rather than half steps
+
+  OUTPUT:
+
+  - tuple ``(num, octave, offset)`` representing the pitch of the harmonic
+    relative to the open string:
+
+    - ``num`` -- non-negative integer; the number of half steps from the open
+      string to the note N in tempered tuning closest the first octave shift of
+      the harmonic
+
+    - ``octave`` -- number of octaves from the note near N to the actual pitch
+      of the harmonic
+
+    - ``offset`` -- number of cents from note N (in tempered tuning) to the
+      actual pitch of the octave-shifted harmonic.  If ``offset`` is positive,
+      the harmonic sounds that much sharp relative to the tempered note; if
+      negative it sounds flat but the indicated magnitude.
+
+  EXAMPLES:
+
+    >>> H.harmonic_interval(1)
+    (0, 0, 0)
+    >>> H.harmonic_interval(2)
+    (0, 1, 0)
+    >>> H.harmonic_interval(3)
+    (7, 1, 2)
+
+  The last example indicates that the 3rd harmonic sounds close to 7 half steps
+  above the fundamental (a perfect 5th), shifted up one octave, and 2 cents
+  sharp.
+
+  """
+  if tuning is not None:
+    # the period of the tuning need not be an octave, so the octaves of h are
+    # not split off first
+    tuning = as_tuning(tuning)
+    hint, hoff = tuning.nearest(cents_table(h)[h])
+    hoct, hint = divmod(hint, tuning.steps)
+    return hint, hoct, hoff
+  hoct0 = 0
+  while h % 2 == 0:
+    hoct0 += 1
+    h //= 2
+  hint, hoff = _nearest_note(cents_table(h)[h])
+  hoct, hint = hint // 12, hint % 12
+  hoct += hoct0
+  return hint, hoct, hoff
+
+################################  Computation  #################################
+
+def harmonic_nodes(harmonics):
+  """.
+  Return the nodes of a whole range of harmonics as parallel columns.
+
+  INPUT:
+
+  - ``harmonics`` -- positive integer or iterable of positive integers; if an
+    integer ``N``, the harmonics ``2`` through ``N`` are used
+
+  OUTPUT:
+
+  - tuple ``(hs, ms, ns, es)`` of integer arrays of equal length, with one
+    entry per node:
+
+    - ``hs`` -- the harmonic number
+
+    - ``ms`` -- the numerator of the node; the node of harmonic ``h`` with
+      numerator ``m`` divides the string at ``m/h`` of its length from the
+      bridge
+
+    - ``ns``, ``es`` -- the nearest fingered note and offset in cents, exactly
+      as returned by ``note_positions_near_harmonic``
+
+    The nodes are in the same order as repeated calls to
+    ``note_positions_near_harmonic`` would give, and are computed from one
+    ``CentsTable`` for the whole range.
+
+  EXAMPLES:
+
+    >>> hs, ms, ns, es = harmonic_nodes(4)
+    >>> list(zip(hs, ms, ns, es))
+    [(2, 1, 12, 0), (3, 2, 7, 2), (3, 1, 19, 2), (4, 3, 5, -2), (4, 1, 24, 0)]
+    >>> list(harmonic_nodes([3])[2])
+    [7, 19]
+
+  """
+  if isinstance(harmonics, int):
+    harmonics = range(2, harmonics+1)
+  else:
+    harmonics = list(harmonics)
+  hs, ms, ns, es = array('i'), array('i'), array('i'), array('i')
+  if not harmonics:
+    return hs, ms, ns, es
+  if min(harmonics) < 0:
+    raise TypeError('harmonics must be positive integers')
+  top = max(harmonics)
+  table = cents_table(top)
+  cents2 = [2*c for c in table.tolist(top)]
+  step, step2, unit2 = _STEP, 2*_STEP, 2*CENT_UNITS
+  shift = CENT_UNITS - _STEP
+  for h in harmonics:
+    # _nearest_note, inlined and applied a whole harmonic at a time: d is
+    # twice the interval, plus one step, so n is d // step2 and e is the
+    # remainder, less one step, rounded to whole cents
+    ms_h = table.coprimes(h)
+    d_h = cents2[h] + step
+    ds = [d_h - cents2[m] for m in ms_h]
+    hs.extend(repeat(h, len(ms_h)))
+    ms.extend(ms_h)
+    ns.extend([d // step2 for d in ds])
+    es.extend([(d % step2 + shift) // unit2 for d in ds])
+  return hs, ms, ns, es
+
+################################  Computation  #################################
+
+def tuning_tables(harmonics, tunings):
+  """.
+  Return the nodes of a range of harmonics relative to several tunings at once.
+
+  INPUT:
+
+  - ``harmonics`` -- positive integer or iterable of positive integers, as for
+    ``harmonic_nodes``
+
+  - ``tunings`` -- list of tunings, each as for ``note_positions_near_harmonic``
+
+  OUTPUT:
+
+  - tuple ``(hs, ms, columns)``, where ``hs`` and ``ms`` are the harmonic and
+    numerator columns of ``harmonic_nodes``, and ``columns`` is a list with one
+    pair ``(ns, es)`` of integer arrays for each tuning, giving the nearest
+    step and offset in cents of each node as in
+    ``note_positions_near_harmonic(h, tuning)``.
+
+  The nodes and their sizes in cents are computed once, a harmonic at a time,
+  and each tuning is then applied to the whole harmonic.
+
+  EXAMPLES:
+
+    >>> hs, ms, columns = tuning_tables(3, [12, 19, 53])
+    >>> [list(zip(*c)) for c in columns]
+    [[(12, 0), (7, 2), (19, 2)], [(19, 0), (11, 7), (30, 7)], [(53, 0), (31, 0), (84, 0)]]
+
+  """
+  if isinstance(harmonics, int):
+    harmonics = range(2, harmonics+1)
+  else:
+    harmonics = list(harmonics)
+  hs, ms = array('i'), array('i')
+  tunings = [as_tuning(t) for t in tunings]
+  columns = [(array('i'), array('i')) for t in tunings]
+  if not harmonics:
+    return hs, ms, columns
+  top = max(harmonics)
+  table = cents_table(top)
+  cents = table.tolist(top)
+  nearest = [(t.nearest, ns, es) for t,(ns,es) in zip(tunings, columns)]
+  for h in harmonics:
+    ms_h = table.coprimes(h)
+    c_h = cents[h]
+    cs = [c_h - cents[m] for m in ms_h]
+    hs.extend(repeat(h, len(ms_h)))
+    ms.extend(ms_h)
+    for f, ns, es in nearest:
+      pairs = list(map(f, cs))
+      ns.extend([n for n,e in pairs])
+      es.extend([e for n,e in pairs])
+  return hs, ms, columns
+
+TuningError = namedtuple('TuningError', ['tuning', 'mean', 'rms', 'max'])
+
+def compare_tunings(harmonics, tunings):
+  """.
+  Compare how closely several tunings fit the nodes of a range of harmonics.
+
+  INPUT:
+
+  - ``harmonics`` -- positive integer or iterable of positive integers, as for
+    ``harmonic_nodes``
+
+  - ``tunings`` -- list of tunings, each as for ``note_positions_near_harmonic``
+
+  OUTPUT:
+
+  - tuple ``(hs, ms, columns, errors)``, where ``hs``, ``ms`` and ``columns``
+    are the node table of ``tuning_tables``, with one column pair ``(ns, es)``
+    of nearest step and offset in cents per tuning, and ``errors`` is a list
+    with one ``TuningError(tuning, mean, rms, max)`` per tuning giving the
+    mean, root mean square and largest absolute offset in cents over all the
+    nodes.
+
+  The table is built in one pass by ``tuning_tables``, so the position of
+  each node is computed only once however many tunings are compared.
+
+  EXAMPLES:
+
+    >>> hs, ms, columns, errors = compare_tunings(7, [12, 19, 31])
+    >>> [(e.tuning, e.max) for e in errors]
+    [(EqualTemperament(12), 33), (EqualTemperament(19), 21), (EqualTemperament(31), 6)]
+    >>> min(errors, key=lambda e: e.rms).tuning
+    EqualTemperament(31)
+
+  """
+  tunings = [as_tuning(t) for t in tunings]
+  hs, ms, columns = tuning_tables(harmonics, tunings)
+  errors = []
+  for t, (ns, es) in zip(tunings, columns):
+    if es:
+      mean = sum(map(abs, es)) / len(es)
+      rms = (sum(e*e for e in es) / len(es)) ** 0.5
+      errors.append(TuningError(t, mean, rms, max(map(abs, es))))
+    else:
+      errors.append(TuningError(t, 0.0, 0.0, 0))
+  return hs, ms, columns, errors
+
+################################  Computation  #################################
+
+def farey_nodes(max_harmonic):
+  """.
+  Generate every harmonic node up to a given harmonic, in order of position on
+  the string.
+
+  INPUT:
+
+  - ``max_harmonic`` -- positive integer; largest harmonic number to include
+
+  OUTPUT:
+
+  - generator of pairs ``(h,m)``, one for each distinct node position, where
+    ``h`` is the lowest harmonic having a node there and ``m/h`` (in lowest
+    terms) is the fraction of the string length from the node to the bridge.
+    The nodes are generated from the nut towards the bridge, i.e. in order of
+    increasing fingered pitch.
+
+  The pairs are the terms of the Farey sequence of order ``max_harmonic`` in
+  decreasing order, each obtained from the previous two by the usual
+  recurrence, so no fractions need to be reduced or sorted.
+
+  EXAMPLES:
+
+    >>> list(farey_nodes(4))
+    [(4, 3), (3, 2), (2, 1), (3, 1), (4, 1)]
+    >>> list(farey_nodes(1))
+    []
+
+  """
+  N = max_harmonic
+  if N < 2:
+    return
+  a, b, c, d = 1, 1, N-1, N
+  while c > 0:
+    yield d, c
+    k = (N + b) // d
+    a, b, c, d = c, d, k*c - a, k*d - b
+
+################################  Computation  #################################
+
+def note_positions_in_range(h, lo, hi):
+  """.
+  Generate the note numbers and offsets of the nodes of a harmonic whose
+  nearest fingered note lies in a given range.
+
+  INPUT:
+
+  - ``h`` -- positive integer; the harmonic number
+
+  - ``lo``, ``hi`` -- integers; the lowest and highest note numbers (half
+    steps above the open string) to include
+
+  OUTPUT:
+
+  - generator of pairs ``(n,e)`` as in ``note_positions_near_harmonic``,
+    restricted to ``lo <= n <= hi`` and in the same order.
+
+  Only the numerators ``m`` whose node ``m/h`` can round into the range are
+  examined; they are bounded in advance from the range, so the work is
+  proportional to the number of nodes produced rather than to ``h``.
+
+  EXAMPLES:
+
+    >>> note_positions_near_harmonic(7)
+    [(3, -33), (6, -17), (10, -31), (15, -33), (22, -31), (34, -31)]
+    >>> list(note_positions_in_range(7, 13, 24))
+    [(15, -33), (22, -31)]
+
+  """
+  if h < 0:
+    raise TypeError('argument must be a positive integer')
+  m_min = max(1, floor(h / HS**(hi+0.5)))
+  m_max = min(h-1, floor(h / HS**(lo-0.5)) + 1)
+  cents = cents_table(h)
+  for m in range(m_max, m_min-1, -1):
+    if gcd(m,h) > 1: continue
+    n, e = _nearest_note(cents[h] - cents[m])
+    if n < lo or n > hi: continue
+    yield n, e
+
+################################  Computation  #################################
+
+class NodeIndex:
+  """.
+  Index of all harmonic nodes up to a given harmonic, by fingered note.
+
+  INPUT:
+
+  - ``max_harmonic`` -- positive integer; largest harmonic number to include;
+    or a ``HarmonicTable`` whose nodes are to be indexed
+
+  The nodes are stored in parallel typed arrays, 22 bytes per node,
+  sorted by exact position on the string, nut to bridge (see ``farey_nodes``):
+
+  - ``positions`` -- position of the node, in half steps above the open string
+
+  - ``semitones``, ``offsets`` -- the nearest fingered note and offset in
+    cents, as returned by ``note_positions_near_harmonic``
+
+  - ``harmonics``, ``numerators`` -- the lowest harmonic ``h`` with a node
+    there, and the numerator ``m`` of the node ``m/h``
+
+  Since ``semitones`` and ``positions`` are sorted, lookups by fingered note
+  (``at``, ``between``) or by exact position in cents (``within``, ``nearest``)
+  are binary searches.
+  Use ``node_index`` to get a shared index rather than building a new one.
+
+  EXAMPLES:
+
+    >>> index = NodeIndex(8)
+    >>> index.at(12)
+    [(0, 2)]
+    >>> index.between(3, 5)
+    [(3, -33, 7), (3, 16, 6), (4, -14, 5), (5, -2, 4)]
+    >>> [(round(c,1), h, m) for c,h,m in index.within(500, 20)]
+    [(498.0, 4, 3)]
+    >>> [(h, m) for c,h,m in index.nearest(330, k=3)]
+    [(6, 5), (5, 4), (7, 6)]
+
+  """
+
+  def __init__(self, max_harmonic):
+    if isinstance(max_harmonic, HarmonicTable):
+      self._init_from_table(max_harmonic)
+      return
+    self.max_harmonic = max_harmonic
+    cents = cents_table(max_harmonic)
+    self.positions = array('d')
+    self.semitones = array('i')
+    self.offsets = array('h')
+    self.harmonics = array('i')
+    self.numerators = array('i')
+    for h,m in farey_nodes(max_harmonic):
+      c = cents[h] - cents[m]
+      n, e = _nearest_note(c)
+      self.positions.append(c / _STEP)
+      self.semitones.append(n)
+      self.offsets.append(e)
+      self.harmonics.append(h)
+      self.numerators.append(m)
+
+  def _init_from_table(self, table):
+    # farey_nodes gives each reduced node m/h of the table once, in order of
+    # position, and the nodes of each harmonic in the order of its rows in the
+    # table, so a cursor per harmonic finds the row of each node in turn
+    N = self.max_harmonic = table.max_harmonic
+    cents, step = cents_table(N).tolist(N), _STEP
+    cursor = table._starts.tolist()
+    semitones, offsets = table.semitones, table.cents
+    self.positions = array('d')
+    self.semitones = array('i')
+    self.offsets = array('h')
+    self.harmonics = array('i')
+    self.numerators = array('i')
+    add_p, add_n, add_e = self.positions.append, self.semitones.append, self.offsets.append
+    add_h, add_m = self.harmonics.append, self.numerators.append
+    for h,m in farey_nodes(N):
+      i = cursor[h]
+      cursor[h] = i + 1
+      add_p((cents[h] - cents[m]) / step)
+      add_n(semitones[i])
+      add_e(offsets[i])
+      add_h(h)
+      add_m(m)
+
+  def __len__(self):
+    return len(self.positions)
+
+  def _span(self, a, b):
+    return bisect_left(self.semitones, a), bisect_right(self.semitones, b)
+
+  def at(self, n):
+    """
+    Return the list of pairs ``(e,h)`` of offset and harmonic number for the
+    nodes nearest fingered note ``n``, in order of position.
+    """
+    i, j = self._span(n, n)
+    return list(zip(self.offsets[i:j], self.harmonics[i:j]))
+
+  def between(self, a, b):
+    """
+    Return the list of triples ``(n,e,h)`` of fingered note, offset and
+    harmonic number for the nodes nearest fingered notes ``a`` through ``b``,
+    in order of position.
+    """
+    i, j = self._span(a, b)
+    return list(zip(self.semitones[i:j], self.offsets[i:j], self.harmonics[i:j]))
+
+  def _node(self, i):
+    return 100*self.positions[i], self.harmonics[i], self.numerators[i]
+
+  def within(self, cents, tolerance):
+    """
+    Return the list of triples ``(c,h,m)`` for the nodes whose exact position
+    ``c``, in cents above the open string, lies within ``tolerance`` cents of
+    ``cents``; ``m/h`` is the node.  The nodes are in order of position.
+    """
+    i = bisect_left(self.positions, (cents - tolerance)/100)
+    j = bisect_right(self.positions, (cents + tolerance)/100)
+    return [self._node(f) for f in range(i, j)]
+
+  def nearest(self, cents, k=1):
+    """
+    Return the list of triples ``(c,h,m)``, as for ``within``, for the ``k``
+    nodes nearest the position ``cents``, nearest first.
+    """
+    p = cents/100
+    positions = self.positions
+    j = bisect_left(positions, p)
+    i = j - 1
+    found = []
+    while len(found) < k and (i >= 0 or j < len(positions)):
+      if j >= len(positions) or (i >= 0 and p - positions[i] <= positions[j] - p):
+        found.append(i)
+        i -= 1
+      else:
+        found.append(j)
+        j += 1
+    return [self._node(f) for f in found]
+
+
+@memoized(maxsize=index_cache_size)
+def node_index(max_harmonic):
+  """
+  Return the ``NodeIndex`` for ``max_harmonic``, building it on first use.
+  Only the ``index_cache_size`` most recently used indexes are kept, since
+  each holds every node up to ``max_harmonic``.
+  """
+  return NodeIndex(max_harmonic)
+
+################################  Computation  #################################
+
+def simplest_node(cents, tolerance, max_harmonic=None):
+  """.
+  Return the node of the lowest harmonic whose position lies near a given
+  position.
+
+  INPUT:
+
+  - ``cents`` -- number; the fingered position, in cents above the open string
+
+  - ``tolerance`` -- non-negative number; the largest distance in cents
+    allowed between ``cents`` and the position of the node
+
+  - ``max_harmonic`` -- optional positive integer; the largest harmonic to
+    consider
+
+  OUTPUT:
+
+  - triple ``(c,h,m)``, as for ``NodeIndex.within``, where ``m/h`` is the node
+    of smallest harmonic ``h`` whose exact position ``c``, in cents above the
+    open string, lies within ``tolerance`` cents of ``cents``; or ``None`` if
+    there is no such node with ``h`` at most ``max_harmonic``.
+
+  The pitch ``h/m`` of the node is the simplest fraction in the range of
+  ratios allowed by the tolerance, which has both the smallest numerator and
+  the smallest denominator there.  It is found by descending the Stern-Brocot
+  tree along the continued fraction expansion of the range, in a number of
+  steps logarithmic in ``h``, without enumerating any nodes.
+
+  EXAMPLES:
+
+    >>> c, h, m = simplest_node(700, 5); round(c, 3), h, m
+    (701.955, 3, 2)
+    >>> c, h, m = simplest_node(700, 1); round(c, 3), h, m
+    (699.023, 295, 197)
+    >>> simplest_node(700, 1, max_harmonic=100) is None
+    True
+
+  """
+  if tolerance < 0:
+    raise ValueError('tolerance must be non-negative')
+  if cents + tolerance <= 0:
+    return None
+  hi = Fraction(2 ** ((cents + tolerance) / 1200))
+  if cents - tolerance <= 0:
+    # every fraction above 1 is at least (k+1)/k for some k
+    k = -(-1 // (hi - 1))
+    h, m = k+1, k
+  else:
+    h, m = _simplest_fraction(Fraction(2 ** ((cents - tolerance) / 1200)), hi)
+  if max_harmonic is not None and h > max_harmonic:
+    return None
+  return 1200 * log(h/m, 2), h, m
+
+
+def _simplest_fraction(a, b):
+  # the pair (p,q) of the simplest fraction p/q in the range [a,b], 0 < a <= b,
+  # built from the continued fraction expansion common to a and b
+  p0, q0, p1, q1 = 0, 1, 1, 0
+  while True:
+    k = floor(a)
+    if k == a or k + 1 <= b:
+      t = k if k == a else k + 1
+      return t*p1 + p0, t*q1 + q0
+    p0, q0, p1, q1 = p1, q1, k*p1 + p0, k*q1 + q0
+    a, b = 1 / (b - k), 1 / (a - k)
+
+
+def simplest_nodes(positions, tolerance, max_harmonic=None):
+  """
+  Return the list of results of ``simplest_node`` for each position in the
+  iterable ``positions``, with the same ``tolerance`` and ``max_harmonic``.
+  Repeated positions are solved only once.
+  """
+  found = {}
+  nodes = []
+  for cents in positions:
+    node = found.get(cents, found)
+    if node is found:
+      node = found[cents] = simplest_node(cents, tolerance, max_harmonic)
+    nodes.append(node)
+  return nodes
+
+################################  Computation  #################################
+
+class HarmonicNode:
+  """
+  One node of a harmonic: the harmonic number ``harmonic``, the numerator
+  ``numerator`` of the node, and the nearest fingered note ``semitone`` and
+  offset ``cents`` as in ``note_positions_near_harmonic``.
+  """
+
+  __slots__ = ('harmonic', 'numerator', 'semitone', 'cents')
+
+  def __init__(self, harmonic, numerator, semitone, cents):
+    self.harmonic = harmonic
+    self.numerator = numerator
+    self.semitone = semitone
+    self.cents = cents
+
+  def __repr__(self):
+    return 'HarmonicNode({}, {}, {}, {})'.format(self.harmonic, self.numerator, self.semitone, self.cents)
+
+  def __eq__(self, other):
+    if not isinstance(other, HarmonicNode):
+      return NotImplemented
+    return self.astuple() == other.astuple()
+
+  def astuple(self):
+    return self.harmonic, self.numerator, self.semitone, self.cents
+
+  @property
+  def interval(self):
+    """
+    The interval, octave and offset of the harmonic, as in ``harmonic_interval``.
+    """
+    return harmonic_interval(self.harmonic)
+
+################################  Computation  #################################
+
+class HarmonicTable:
+  """.
+  Compact table of all nodes of the harmonics up to a given harmonic.
+
+  INPUT:
+
+  - ``max_harmonic`` -- positive integer; largest harmonic number to include
+
+  - ``columns`` -- optional tuple ``(hs, ms, ns, es)`` of already computed
+    columns, as returned by ``harmonic_nodes(max_harmonic)``
+
+  The table is stored column-wise in typed arrays, in the order of
+  ``harmonic_nodes``: ``harmonics``, ``numerators`` and ``semitones`` of 32-bit
+  integers and ``cents`` of 16-bit integers, about 14 bytes per node.
+  Indexing or iterating gives ``HarmonicNode`` objects, created on demand.
+
+  The output functions ``print_harmonics``, ``print_harmonics_by_position``
+  and ``lilypond_harmonics`` accept a table in place of computing the nodes
+  themselves.
+
+  EXAMPLES:
+
+    >>> T = HarmonicTable(8)
+    >>> len(T)
+    21
+    >>> T[1]
+    HarmonicNode(3, 2, 7, 2)
+    >>> T.nodes(7) == note_positions_near_harmonic(7)
+    True
+    >>> T.nodes_in_range(7, 13, 24)
+    [(15, -33), (22, -31)]
+
+  """
+
+  def __init__(self, max_harmonic, columns=None):
+    self.max_harmonic = max_harmonic
+    if columns is None:
+      columns = harmonic_nodes(max_harmonic)
+    hs, ms, ns, es = columns
+    self.harmonics = hs
+    self.numerators = ms
+    self.semitones = ns
+    self.cents = array('h', es)
+    # rows of harmonic h are starts[h]:starts[h+1]
+    starts = array('l', [0]*(max_harmonic+2))
+    for h in hs:
+      starts[h+1] += 1
+    for h in range(1, max_harmonic+2):
+      starts[h] += starts[h-1]
+    self._starts = starts
+    self._index = None
+
+  def __len__(self):
+    return len(self.harmonics)
+
+  def __getitem__(self, i):
+    return HarmonicNode(self.harmonics[i], self.numerators[i], self.semitones[i], self.cents[i])
+
+  def __iter__(self):
+    return map(HarmonicNode, self.harmonics, self.numerators, self.semitones, self.cents)
+
+  def _span(self, h):
+    if not 1 <= h <= self.max_harmonic:
+      raise ValueError('harmonic {} not in table of harmonics up to {}'.format(h, self.max_harmonic))
+    return self._starts[h], self._starts[h+1]
+
+  def nodes(self, h):
+    """
+    Return the list of pairs ``(n,e)`` for the nodes of harmonic ``h``, as
+    ``note_positions_near_harmonic(h)`` would.
+    """
+    i, j = self._span(h)
+    return list(zip(self.semitones[i:j], self.cents[i:j]))
+
+  def nodes_in_range(self, h, lo, hi):
+    """
+    Return the list of pairs ``(n,e)`` for the nodes of harmonic ``h`` with
+    ``lo <= n <= hi``, as ``note_positions_in_range(h, lo, hi)`` would.
+    """
+    i, j = self._span_in_range(h, lo, hi)
+    return list(zip(self.semitones[i:j], self.cents[i:j]))
+
+  def _span_in_range(self, h, lo, hi):
+    # the rows of the nodes of harmonic h with lo <= n <= hi
+    i, j = self._span(h)
+    return bisect_left(self.semitones, lo, i, j), bisect_right(self.semitones, hi, i, j)
+
+  def index(self):
+    """
+    Return a ``NodeIndex`` of the nodes of this table, building it on first use.
+    """
+    if self._index is None:
+      self._index = NodeIndex(self)
+    return self._index
+
+################################  Computation  #################################
+
+def iter_nodes(max_harmonic, order='harmonic'):
+  """.
+  Generate the nodes of all harmonics up to a given harmonic, one at a time.
+
+  INPUT:
+
+  - ``max_harmonic`` -- positive integer; largest harmonic number to include
+
+  - ``order`` -- string (default: 'harmonic'); either 'harmonic', for the nodes
+    of each harmonic in turn, in the order of ``harmonic_nodes``; or
+    'position', for each distinct node position once, with its lowest
+    harmonic, from the nut towards the bridge as in ``farey_nodes``
+
+  OUTPUT:
+
+  - generator of ``HarmonicNode`` objects
+
+  Nothing is computed ahead of what has been consumed, so memory use does not
+  grow with ``max_harmonic``.
+
+  EXAMPLES:
+
+    >>> [node.astuple() for node in iter_nodes(4)]
+    [(2, 1, 12, 0), (3, 2, 7, 2), (3, 1, 19, 2), (4, 3, 5, -2), (4, 1, 24, 0)]
+    >>> [node.semitone for node in iter_nodes(4, order='position')]
+    [5, 7, 12, 19, 24]
+
+  """
+  if order == 'harmonic':
+    pairs = ((h,m) for h in range(2, max_harmonic+1)
+                   for m in range(h-1, 0, -1) if gcd(m,h) == 1)
+  elif order == 'position':
+    pairs = farey_nodes(max_harmonic)
+  else:
+    raise ValueError('unknown node order {}'.format(order))
+  cents = cents_table(max_harmonic)
+  for h,m in pairs:
+    yield HarmonicNode(h, m, *_nearest_note(cents[h] - cents[m]))
+
+################################  Computation  #################################
+
+def totients(N):
+  """
+  Return the list of values of Euler's totient function for ``0, 1, ..., N``;
+  ``totients(N)[h]`` is the number of nodes of harmonic ``h`` when ``h > 1``.
+
+  EXAMPLES:
+
+    >>> totients(10)
+    [0, 1, 1, 2, 2, 4, 2, 6, 4, 6, 4]
+
+  """
+  phi = list(range(N+1))
+  for p in range(2, N+1):
+    if phi[p] == p:
+      for k in range(p, N+1, p):
+        phi[k] -= phi[k] // p
+  return phi
+
+################################  Computation  #################################
+
+def parallel_harmonic_table(max_harmonic, workers=None, min_nodes=200000):
+  """.
+  Compute a ``HarmonicTable`` using a pool of worker processes.
+
+  INPUT:
+
+  - ``max_harmonic`` -- positive integer; largest harmonic number to include
+
+  - ``workers`` -- optional positive integer; number of worker processes; by
+    default, the number of processors
+
+  - ``min_nodes`` -- positive integer (default: 200000); if the table would
+    have fewer nodes than this, it is computed in this process, since starting
+    workers would cost more than it saves
+
+  OUTPUT:
+
+  - a ``HarmonicTable``, identical to ``HarmonicTable(max_harmonic)``
+
+  The range of harmonics is cut into consecutive blocks with about the same
+  number of nodes (harmonic ``h`` has ``totients(h)[h]`` nodes, so the blocks of
+  high harmonics are short), each block is computed by ``harmonic_nodes`` in a
+  worker, and the columns are joined in order.
+
+  """
+  from concurrent.futures import ProcessPoolExecutor
+
+  if workers is None:
+    workers = os.cpu_count() or 1
+  phi = totients(max_harmonic)
+  total = sum(phi[2:])
+  if workers < 2 or total < min_nodes:
+    return HarmonicTable(max_harmonic)
+
+  nblocks = 4*workers
+  blocks = []
+  start, count = 2, 0
+  for h in range(2, max_harmonic+1):
+    count += phi[h]
+    if count >= total * (len(blocks)+1) / nblocks or h == max_harmonic:
+      blocks.append(range(start, h+1))
+      start = h+1
+
+  columns = array('i'), array('i'), array('i'), array('i')
+  with ProcessPoolExecutor(max_workers=workers) as pool:
+    for part in pool.map(harmonic_nodes, blocks):
+      for column, values in zip(columns, part):
+        column.extend(values)
+  return HarmonicTable(max_harmonic, columns)
+
+
+
+################################################################################
+##################################  Storage  ###################################
+################################################################################
+
+_TABLE_MAGIC = b'HRMT'
+_TABLE_VERSION = 2                            # bump whenever the layout or
+                                              # the computed values change
+_TABLE_HEADER = struct.Struct('<4sHIQ')       # magic, version, max harmonic,
+                                              # number of records
+_TABLE_RECORD = struct.Struct('<iiihhhh')     # h, m, n, e, hint, hoct, hoff
+
+
+def write_harmonic_table(filename, max_harmonic):
+  """.
+  Write the table of all harmonic nodes up to a given harmonic to a binary file.
+
+  INPUT:
+
+  - ``filename`` -- name of the file to write
+
+  - ``max_harmonic`` -- positive integer; largest harmonic number to include
+
+  OUTPUT:
+
+  - Writes a header recording the format version and ``max_harmonic``, followed
+    by one fixed-width little-endian record per node, in the order of
+    ``harmonic_nodes``.  Each record holds ``(h, m, n, e, hint, hoct, hoff)``:
+    the harmonic number and numerator of the node, the fingered note and offset
+    as in ``note_positions_near_harmonic``, and the interval, octave and offset
+    of the harmonic as in ``harmonic_interval``.
+
+  The file is read with ``HarmonicTableFile``.
+
+  """
+  hs, ms, ns, es = harmonic_nodes(max_harmonic)
+  pack = _TABLE_RECORD.pack
+  with open(filename, 'wb') as F:
+    F.write(_TABLE_HEADER.pack(_TABLE_MAGIC, _TABLE_VERSION, max_harmonic, len(hs)))
+    F.writelines(pack(h, m, n, e, *harmonic_interval(h))
+                 for h,m,n,e in zip(hs, ms, ns, es))
+
+##################################  Storage  ###################################
+
+class HarmonicTableFile:
+  """.
+  Read-only view of a harmonic table file written by ``write_harmonic_table``.
+
+  INPUT:
+
+  - ``filename`` -- name of the table file
+
+  - ``max_harmonic`` -- optional positive integer; if given, the table must
+    have been written for this largest harmonic
+
+  The file is memory mapped, so opening it costs the same whatever its size,
+  and records are decoded only when accessed.  A ``ValueError`` is raised if
+  the file is not a harmonic table, or if its format version or largest
+  harmonic does not match what this module would compute.  The version
+  changes with the layout of the file and with the way the values are
+  computed, such as the rounding of offsets.
+
+  Indexing gives the records ``(h, m, n, e, hint, hoct, hoff)`` described in
+  ``write_harmonic_table``; ``nodes(h)`` gives the pairs ``(n,e)`` of one
+  harmonic, as ``note_positions_near_harmonic(h)`` would.
+
+  EXAMPLES:
+
+    >>> import tempfile
+    >>> filename = os.path.join(tempfile.mkdtemp(), 'table16.bin')
+    >>> write_harmonic_table(filename, 16)
+    >>> with HarmonicTableFile(filename, max_harmonic=16) as T:
+    ...     print(len(T), T[1], T.nodes(4))
+    79 (3, 2, 7, 2, 7, 1, 2) [(5, -2), (24, 0)]
+    >>> HarmonicTableFile(filename, max_harmonic=32)
+    Traceback (most recent call last):
+    ...
+    ValueError: stale harmonic table: written for max_harmonic 16, not 32
+
+  """
+
+  def __init__(self, filename, max_harmonic=None):
+    with open(filename, 'rb') as F:
+      self._map = mmap.mmap(F.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      self._check(max_harmonic)
+    except Exception:
+      self._map.close()
+      raise
+
+  def _check(self, max_harmonic):
+    if len(self._map) < _TABLE_HEADER.size:
+      raise ValueError('not a harmonic table')
+    magic, version, max_h, count = _TABLE_HEADER.unpack_from(self._map)
+    if magic != _TABLE_MAGIC:
+      raise ValueError('not a harmonic table')
+    if version != _TABLE_VERSION:
+      raise ValueError('stale harmonic table: format {}, not {}'.format(version, _TABLE_VERSION))
+    if max_harmonic is not None and max_h != max_harmonic:
+      raise ValueError('stale harmonic table: written for max_harmonic {}, not {}'.format(max_h, max_harmonic))
+    if len(self._map) != _TABLE_HEADER.size + count * _TABLE_RECORD.size:
+      raise ValueError('truncated harmonic table')
+    self.max_harmonic = max_h
+    self._count = count
+
+  def __len__(self):
+    return self._count
+
+  def __getitem__(self, i):
+    if i < 0:
+      i += self._count
+    if not 0 <= i < self._count:
+      raise IndexError('harmonic table index out of range')
+    return _TABLE_RECORD.unpack_from(self._map, _TABLE_HEADER.size + i*_TABLE_RECORD.size)
+
+  def __iter__(self):
+    # unpack by offset rather than through a memoryview, which would keep the
+    # map from being closed while the iterator is alive
+    unpack_from, size = _TABLE_RECORD.unpack_from, _TABLE_RECORD.size
+    for offset in range(_TABLE_HEADER.size, _TABLE_HEADER.size + self._count*size, size):
+      yield unpack_from(self._map, offset)
+
+  def _first(self, h):
+    # index of the first record with harmonic number at least h
+    lo, hi = 0, self._count
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if self[mid][0] < h:
+        lo = mid + 1
+      else:
+        hi = mid
+    return lo
+
+  def nodes(self, h):
+    """
+    Return the list of pairs ``(n,e)`` for the nodes of harmonic ``h``.
+    """
+    return [self[i][2:4] for i in range(self._first(h), self._first(h+1))]
+
+  def close(self):
+    self._map.close()
 
-  """
-  if h < 0:
-    raise TypeError('argument must be a positive integer')
-  notes = []
-  for m in range(1,h):
-    if gcd(m,h) > 1: continue
-    lg = log(h/m,HS)
-    n = int(round(lg))
-    e = int(round(100*(lg-n)))
-    notes.append((n,e))
-  notes.reverse()
-  return notes
+  def __enter__(self):
+    return self
 
-################################  Computation  #################################
+  def __exit__(self, *exc):
+    self.close()
+
+##################################  Storage  ###################################
+
+EXPORT_FIELDS = ('string', 'harmonic', 'node', 'fingered_note', 'octave',
+                 'offset', 'sounding_note', 'sounding_offset')
+
+_EXPORT_MAGIC = b'HRMX'
+_EXPORT_VERSION = 2
+_EXPORT_COLUMNS = 'HiiihhHh'     # array typecode of each field in binary format
 
-def harmonic_interval(h):
-  """Return the chromatic interval, octave, and offset of a harmonic.
+
+def export_harmonics(filename, strings, max_harmonic, format='csv', batch_size=65536):
+  """.
+  Export the table of all harmonic nodes on given strings to a file.
 
   INPUT:
 
-  - ``h`` -- positive integer; the harmonic number
+  - ``filename`` -- name of the file to write
+
+  - ``strings`` -- list of note names of open strings
+
+  - ``max_harmonic`` -- positive integer; largest harmonic number to include
+
+  - ``format`` -- string (default: 'csv'); one of 'csv', 'jsonl' or 'binary'
+
+  - ``batch_size`` -- positive integer (default: 65536); number of nodes
+    computed and written at a time
 
   OUTPUT:
 
-  - tuple ``(num, octave, offset)`` representing the pitch of the harmonic
-    relative to the open string:
+  - Writes one row for each node of each harmonic from 2 to ``max_harmonic``
+    and each string, in order of harmonic, then of position on the string,
+    then of the strings as given.  The fields of a row (``EXPORT_FIELDS``) are:
 
-    - ``num`` -- non-negative integer; the number of half steps from the open
-      string to the note N in tempered tuning closest the first octave shift of
-      the harmonic
+    - ``string`` -- name of the open string
 
-    - ``octave`` -- number of octaves from the note near N to the actual pitch
-      of the harmonic
+    - ``harmonic``, ``node`` -- the harmonic number ``h`` and the numerator
+      ``m`` of the node ``m/h``, as in ``harmonic_nodes``
 
-    - ``offset`` -- number of cents from note N (in tempered tuning) to the
-      actual pitch of the octave-shifted harmonic.  If ``offset`` is positive,
-      the harmonic sounds that much sharp relative to the tempered note; if
-      negative it sounds flat but the indicated magnitude.
+    - ``fingered_note``, ``octave``, ``offset`` -- name and (0-based) octave of
+      the fingered note nearest the node, and the offset in cents of the node
+      from it, as in ``print_harmonics``
 
-  EXAMPLES:
+    - ``sounding_note``, ``sounding_offset`` -- name of the note nearest the
+      sound of the harmonic, and the offset in cents of the harmonic from it
 
-    >>> H.harmonic_interval(1)
-    (0, 0, 0)
-    >>> H.harmonic_interval(2)
-    (0, 1, 0)
-    >>> H.harmonic_interval(3)
-    (7, 1, 2)
+    The 'csv' format has a header line of field names; 'jsonl' has one JSON
+    object per line.  The 'binary' format is for bulk loading: after the magic
+    bytes ``b'HRMX'``, a little-endian uint16 format version, a uint16 count
+    and that many length-prefixed (uint16) UTF-8 string names, it has a
+    sequence of blocks, each a uint32 row count followed by one little-endian
+    array per field: uint16 index of the string in the header, int32 harmonic,
+    int32 node, int32 fingered note (as half steps above the open string),
+    int16 octave, int16 offset, uint16 sounding note (as half steps above the
+    open string, less than 12) and int16 sounding offset.
 
-  The last example indicates that the 3rd harmonic sounds close to 7 half steps
-  above the fundamental (a perfect 5th), shifted up one octave, and 2 cents
-  sharp.
+  Nodes are generated by ``iter_nodes`` and written ``batch_size`` at a time,
+  so memory use does not grow with the size of the table.
+
+  EXAMPLES:
+
+    >>> import tempfile
+    >>> filename = os.path.join(tempfile.mkdtemp(), 'harmonics.csv')
+    >>> export_harmonics(filename, ['A', 'D'], 3)
+    >>> with open(filename) as F:
+    ...     rows = list(csv.reader(F))
+    >>> for row in rows[:4]: print(','.join(row))
+    string,harmonic,node,fingered_note,octave,offset,sounding_note,sounding_offset
+    A,2,1,A,0,0,A,0
+    D,2,1,D,0,0,D,0
+    A,3,2,E,0,2,E,2
+    >>> filename = os.path.join(tempfile.mkdtemp(), 'harmonics.jsonl')
+    >>> export_harmonics(filename, ['A', 'D'], 3, format='jsonl')
+    >>> with open(filename) as F:
+    ...     records = [json.loads(line) for line in F]
+    >>> len(records), records[-1]['fingered_note'], records[-1]['octave']
+    (6, 'A', 1)
 
   """
-  hoct0 = 0
-  while h % 2 == 0:
-    hoct0 += 1
-    h //= 2
-  logh = log(h,HS)
-  hint = round(logh)
-  hoff = round(100*(logh - hint))
-  hoct, hint = hint // 12, hint % 12
-  hoct += hoct0
-  return hint, hoct, hoff
+  if format not in ('csv', 'jsonl', 'binary'):
+    raise ValueError('unknown export format {}'.format(format))
+  if len(strings) > 0xffff:
+    raise ValueError('cannot export more than {} strings'.format(0xffff))
+  string_nums = [note_number(s) for s in strings]
+  names = [[note_name(num + k) for k in range(12)] for num in string_nums]
+  string_names = [n[0] for n in names]
+  nodes = iter_nodes(max_harmonic)
+
+  def batches():
+    while True:
+      batch = list(islice(nodes, batch_size))
+      if not batch:
+        return
+      yield [(i, node.harmonic, node.numerator, node.semitone, (node.semitone-1)//12,
+              node.cents) + harmonic_interval(node.harmonic)[::2]
+             for node in batch for i in range(len(strings))]
+
+  if format == 'binary':
+    with open(filename, 'wb') as F:
+      F.write(struct.pack('<4sHH', _EXPORT_MAGIC, _EXPORT_VERSION, len(strings)))
+      for name in string_names:
+        data = name.encode('utf-8')
+        F.write(struct.pack('<H', len(data)) + data)
+      for rows in batches():
+        F.write(struct.pack('<I', len(rows)))
+        for code, values in zip(_EXPORT_COLUMNS, zip(*rows)):
+          column = array(code, values)
+          if sys.byteorder == 'big':
+            column.byteswap()
+          F.write(column.tobytes())
+    return
+
+  def text_rows(rows):
+    for i, h, m, n, o, e, hint, hoff in rows:
+      yield (string_names[i], h, m, names[i][n % 12], o, e, names[i][hint], hoff)
 
+  with open(filename, 'w', newline='') as F:
+    if format == 'csv':
+      writer = csv.writer(F, lineterminator='\n')
+      writer.writerow(EXPORT_FIELDS)
+      for rows in batches():
+        writer.writerows(text_rows(rows))
+    else:
+      dumps = json.dumps
+      for rows in batches():
+        F.writelines(dumps(dict(zip(EXPORT_FIELDS, row))) + '\n' for row in text_rows(rows))
 
 
 ################################################################################
 ###################################  Output  ###################################
 ################################################################################
 
-def print_harmonics(string, octave=0, max_harmonic=16):
+def harmonics_lines(string, octave=0, max_harmonic=16, table=None):
+  """
+  Generate the lines of the table printed by ``print_harmonics``, one at a
+  time, so that a consumer can write each as it is produced or stop early.
+  Arguments are as for ``print_harmonics``.
+  """
+  string_num = note_number(string)
+  names = [note_name(string_num + k) for k in range(12)]
+  lo, hi = 12*octave+1, 12*octave+12
+  if table is None:
+    nodes_of = lambda h: note_positions_in_range(h, lo, hi)
+  else:
+    nodes_of = lambda h: table.nodes_in_range(h, lo, hi)
+  return _harmonics_lines(names, octave, max_harmonic, nodes_of, harmonic_interval)
+
+
+def _harmonics_lines(names, octave, max_harmonic, nodes_of, interval):
+  # the lines of harmonics_lines, given the note names of the string, a
+  # function giving the pairs (n,e) of the nodes of a harmonic in the octave,
+  # and one giving the interval of a harmonic
+  max_harm_oct = floor(log(max_harmonic,2))
+  ndashes = 7+max_harm_oct
+  ndashes0 = ndashes//2
+  ndashes1 = ndashes - ndashes0
+  dashes0 = '-'*ndashes0
+  dashes1 = '-'*ndashes1
+  harmonic_fmt = '  {{:>2}} {{:>{}}}{{:<2}} ({{:+3d}} cents):   '.format(max_harm_oct).format
+  node_fmt = '{}{:<2}  ({:+3d} cents)'.format
+  yield ''
+  yield '{} string, {} octave:'.format(names[0], ordinal(octave))
+  yield ''
+  yield '  {} harmonic {}    -- finger at --'.format(dashes0,dashes1)
+  for h in range(2,max_harmonic+1):
+    yield ''
+    prefix = None
+    for n,e in nodes_of(h):
+      if prefix is None:
+        hint,hoct,hoff = interval(h)
+        prefix = harmonic_fmt(h, '+'*hoct, names[hint], hoff)
+      yield node_fmt(prefix, names[n % 12], e)
+
+###################################  Output  ###################################
+
+def print_harmonics(string, octave=0, max_harmonic=16, table=None, file=None):
   """.
 
   Print a table locations of all harmonic nodes in a given octave.
@@ -306,6 +2122,11 @@ def print_harmonics(string, octave=0, max_harmonic=16):
   - ``max_harmonic`` -- positive integer (default: 16); largest harmonic number
     to include
 
+  - ``table`` -- optional ``HarmonicTable`` for at least ``max_harmonic``
+    harmonics, from which to take the node locations
+
+  - ``file`` -- optional text stream (default: ``sys.stdout``) to which to write
+
   OUTPUT:
 
   - a string, showing a table of harmonics and their node locations in the given
@@ -346,36 +2167,136 @@ def print_harmonics(string, octave=0, max_harmonic=16):
 
        8 +++A  ( +0 cents):   D   ( -2 cents)
 
+  """
+  if file is None:
+    file = sys.stdout
+  file.writelines(line + '\n' for line in harmonics_lines(string, octave, max_harmonic, table))
+
+
+###################################  Output  ###################################
+
+def format_harmonics(string, octave=0, max_harmonic=16, table=None):
+  """
+  Return the table printed by ``print_harmonics``, with the same arguments, as
+  a single string.
+
+  EXAMPLES:
+
+    >>> print(format_harmonics('A', octave=1, max_harmonic=4), end='')
+    <BLANKLINE>
+    A string, 2nd octave:
+    <BLANKLINE>
+      ---- harmonic -----    -- finger at --
+    <BLANKLINE>
+    <BLANKLINE>
+       3  +E  ( +2 cents):   E   ( +2 cents)
+    <BLANKLINE>
+       4 ++A  ( +0 cents):   A   ( +0 cents)
+
+  """
+  return ''.join(line + '\n' for line in harmonics_lines(string, octave, max_harmonic, table))
+
+
+###################################  Output  ###################################
+
+
+def harmonics_by_position_lines(string, octaves=(0,), max_harmonic=16, table=None,
+                                use_index=False):
+  """
+  Generate the lines of the table printed by ``print_harmonics_by_position``,
+  one at a time, so that a consumer can write each as it is produced or stop
+  early.  Arguments are as for ``print_harmonics_by_position``.
+
+  Without a ``table``, the nodes are looked up in the shared ``node_index``
+  for ``max_harmonic`` if it has already been built, or if ``use_index`` is
+  True.  Otherwise they are taken from ``farey_nodes`` in order of position,
+  grouped by fingered note as they arrive, and generation stops after the
+  highest octave shown; only the rows of octaves shown out of increasing
+  order are held in memory.
   """
   string_num = note_number(string)
+  if table is not None and table.max_harmonic != max_harmonic:
+    raise ValueError('table is for harmonics up to {}, not {}'.format(table.max_harmonic, max_harmonic))
+  names = [note_name(string_num + k) for k in range(12)]
+  octaves = list(octaves)
+  if table is not None:
+    index = table.index()
+  elif use_index:
+    index = node_index(max_harmonic)
+  else:
+    index = node_index.cache.peek((max_harmonic,))
+  if index is not None:
+    rows = ((a, index.between(12*a+1, 12*a+12)) for a in octaves)
+  elif not octaves:
+    rows = ()
+  elif octaves == sorted(set(octaves)):
+    rows = _stream_octaves(octaves, _nodes_by_octave(max_harmonic, octaves[0], octaves[-1]))
+  else:
+    shown = {a:[] for a in octaves}
+    for a,n,e,h in _nodes_by_octave(max_harmonic, min(octaves), max(octaves)):
+      if a in shown:
+        shown[a].append((n,e,h))
+    rows = ((a, shown[a]) for a in octaves)
+  return _by_position_lines(names, max_harmonic, rows, harmonic_interval)
+
+
+def _by_position_lines(names, max_harmonic, rows, interval):
+  # the lines of harmonics_by_position_lines, given the note names of the
+  # string, pairs (a, nodes) of an octave and its triples (n,e,h) in order of
+  # position, and a function giving the interval of a harmonic
   max_harm_oct = floor(log(max_harmonic,2))
-  ndashes = 7+max_harm_oct
+  ndashes = 7 + max_harm_oct
   ndashes0 = ndashes//2
   ndashes1 = ndashes - ndashes0
   dashes0 = '-'*ndashes0
   dashes1 = '-'*ndashes1
-  print('\n{} string, {} octave:'.format(note_name(string_num), ordinal(octave)))
-  print('')
-  print('  {} harmonic {}    -- finger at --'.format(dashes0,dashes1))
-  for h in range(2,max_harmonic+1):
-    hint,hoct,hoff = harmonic_interval(h)
-    print('')
-    for n,e in note_positions_near_harmonic(h):
-      if floor((n-1)/12) != octave: continue
-      note = note_name(n+string_num)
-      hnote = note_name(string_num + hint)
-      e_sgn = '+' if e>=0 else '-'
-      e = e_sgn + str(abs(e))
-      note = note_name(string_num + n)
-      hoff_sgn = '+' if hoff>=0 else '-'
-      hoff_str = hoff_sgn + str(abs(hoff))
-      print('  {0:>2} {1:>{2}}{3:<2} ({4:>3} cents):   {5:<2}  ({6:>3} cents)'.format(h,'+'*hoct,max_harm_oct,hnote,hoff_str,note,e))
+  row_fmt = '  {{:<2}}  ({{:+3d}} cents):  {{:>2}} {{:>{}}}{{:<2}} ({{:+3d}} cents)'.format(max_harm_oct).format
+  yield ''
+  yield '{} string:'.format(names[0])
+  yield ''
+  yield '  -- finger at --   {} harmonic {}'.format(dashes0,dashes1)
+  for a, nodes in rows:
+    yield ''
+    yield '{} octave'.format(ordinal(a))
+    last = None
+    for n,e,h in nodes:
+      if n != last:
+        yield ''
+        last = n
+      hint, hoct, hoff = interval(h)
+      yield row_fmt(names[n % 12], e, h, '+'*hoct, names[hint], hoff)
+
+
+def _stream_octaves(octaves, nodes):
+  # generate pairs (a, rows) for the increasing octaves a, taking the rows
+  # (n,e,h) of each from nodes, as generated by _nodes_by_octave, as they come
+  node = next(nodes, None)
+  def group(a):
+    nonlocal node
+    while node is not None and node[0] <= a:
+      if node[0] == a:
+        yield node[1:]
+      node = next(nodes, None)
+  for a in octaves:
+    yield a, group(a)
 
 
-###################################  Output  ###################################
+def _nodes_by_octave(max_harmonic, lo, hi):
+  # generate (a,n,e,h) for the nodes nearest fingered notes in octaves lo
+  # through hi, in order of position; a is the octave of the fingered note n
+  cents = cents_table(max_harmonic)
+  for h,m in farey_nodes(max_harmonic):
+    n, e = _nearest_note(cents[h] - cents[m])
+    a = (n - 1) // 12
+    if a > hi:
+      return
+    if a >= lo:
+      yield a, n, e, h
 
+###################################  Output  ###################################
 
-def print_harmonics_by_position(string, octaves=(0,), max_harmonic=16):
+def print_harmonics_by_position(string, octaves=(0,), max_harmonic=16, table=None, file=None,
+                                use_index=False):
   """.
 
   Print a table notes on given string in given octave, and the harmonics nearest them.
@@ -390,6 +2311,16 @@ def print_harmonics_by_position(string, octaves=(0,), max_harmonic=16):
   - ``max_harmonic`` -- positive integer (default: 16); largest number harmonic
     to include
 
+  - ``table`` -- optional ``HarmonicTable`` for exactly ``max_harmonic``
+    harmonics, from which to take the node locations
+
+  - ``file`` -- optional text stream (default: ``sys.stdout``) to which to write
+
+  - ``use_index`` -- boolean (default: False); whether to build the shared
+    ``node_index`` for ``max_harmonic``, if there is no ``table``, so that
+    later tables for the same ``max_harmonic`` are looked up rather than
+    computed; an index already built is used in any case
+
   OUTPUT:
 
   - a string, showing a table of each fingered note in the given octaves, and
@@ -410,6 +2341,9 @@ def print_harmonics_by_position(string, octaves=(0,), max_harmonic=16):
   - number of cents sharp (positive) or flat (negative) that the harmonic sounds
     relative to the indicated note in tempered tuning
 
+  Rows for the same fingered note are listed in order of the exact position of
+  the node on the string, nut to bridge.
+
 
   EXAMPLES:
 
@@ -464,49 +2398,280 @@ def print_harmonics_by_position(string, octaves=(0,), max_harmonic=16):
       A   ( +0 cents):   4 ++A  ( +0 cents)
 
   """
-  string_num = note_number(string)
-  notes = {h:note_positions_near_harmonic(h) for h in range(2,max_harmonic+1)}
-  harms = {}
-  for h,ne in notes.items():
-    for n,e in ne:
-      harms.setdefault(n,[])
-      harms[n].append((e,h))
-  for eh in harms.values():
-    eh.sort()
-  max_harm_oct = floor(log(max_harmonic,2))
-  ndashes = 7 + max_harm_oct
-  ndashes0 = ndashes//2
-  ndashes1 = ndashes - ndashes0
-  dashes0 = '-'*ndashes0
-  dashes1 = '-'*ndashes1
-  print('\n{} string:'.format(note_name(string_num)))
-  print('')
-  print('  -- finger at --   {} harmonic {}'.format(dashes0,dashes1))
-  for a in octaves:
-    print('')
-    print('{} octave'.format(ordinal(a)))
-    for b in range(12):
-      n = a*12 + b + 1
-      if n not in harms: continue
-      print('')
-      for e,h in harms[n]:
-        hint, hoct, hoff = harmonic_interval(h)
-        hnote = note_name(string_num + hint)
-        e_sgn = '+' if e>=0 else '-'
-        e = e_sgn + str(abs(e))
-        note = note_name(string_num + n)
-        hoff_sgn = '+' if hoff>=0 else '-'
-        hoff = hoff_sgn + str(abs(hoff))
-        print('  {0:<2}  ({1:>3} cents):  {2:>2} {3:>{4}}{5:<2} ({6:>3} cents)'.format(note,e,h,'+'*hoct,max_harm_oct,hnote,hoff))
+  if file is None:
+    file = sys.stdout
+  file.writelines(line + '\n' for line in
+                  harmonics_by_position_lines(string, octaves, max_harmonic, table, use_index))
+
+
+###################################  Output  ###################################
+
+def format_harmonics_by_position(string, octaves=(0,), max_harmonic=16, table=None,
+                                 use_index=False):
+  """
+  Return the table printed by ``print_harmonics_by_position``, with the same
+  arguments, as a single string.
+  """
+  return ''.join(line + '\n' for line in
+                 harmonics_by_position_lines(string, octaves, max_harmonic, table, use_index))
 
 
 ###################################  Output  ###################################
  
 
+# note names as in "english.ly", which the preamble includes, whatever notation
+# is in effect for display
+LILYPOND_NOTATION = Notation(flat='f', sharp='s')
+
+_LILYPOND_PREAMBLE = r'''\version "2.20.0"
+\include "english.ly"
+  \header
+  {
+    copyright = "All rights to this work are waived under Creative Commons Licens CC0.  See https://creativecommons.org/publicdomain/zero/1.0/"
+    tagline = ##f
+    print-all-headers = ##t
+  }
+#(set-default-paper-size "letter")
+global = 
+{
+  \omit Score.TimeSignature
+  \cadenzaOn
+}
+'''
+
+_LILYPOND_SCORE = r'''\score
+{{
+  \header
+  {{
+    tagline = ##f
+    piece = \markup \column {{ "{instrument} {string}-string, {octave} octave" \vspace #1 }}
+  }}
+  \new StaffGroup
+  <<
+    \new Staff = "pitch" \with {{ instrumentName = "pitch" }}
+    <<
+      \new Voice = "pitch" {{ \pitches{suff} }}
+    >>
+    \new Staff = "location" \with {{ instrumentName = "location" }}
+    << \locations{suff} >>
+    \new Lyrics \with {{ alignAboveContext = "pitch" }}
+    {{
+      \lyricsto "pitch" \nums{suff}
+    }}
+  >>
+}}
+
+\layout
+{{
+  \context {{
+    \StaffGroup
+    \consists #Span_stem_engraver
+  }}
+  \context {{
+    \Score
+    \override SpacingSpanner.base-shortest-duration = #(ly:make-moment 1/{note_spacing})
+  }}
+}}
+  
+\paper
+{{
+  system-system-spacing = #'((basic-distance . 1) (padding . {staff_spacing}))
+  top-margin = 25
+  left-margin = 25
+  right-margin = 25
+  ragged-bottom = ##t
+  print-page-number = ##f
+}}
+'''
+
+
+class LilypondWriter:
+  """.
+  Writer of Lilypond harmonic fingering charts to a text stream.
+
+  INPUT:
+
+  - ``stream`` -- an open text file, or any object with a ``write`` method
+
+  Each method writes its output directly to ``stream``; nothing is
+  accumulated.  A document is the ``preamble`` followed by one or more
+  ``chart`` calls, with a ``separator`` between charts.  Notes are always
+  written with the English note names the preamble includes
+  (``LILYPOND_NOTATION``); the notation in effect is used only to read the
+  names of strings and to show them in chart titles.
+
+  EXAMPLES:
+
+    >>> import io
+    >>> out = io.StringIO()
+    >>> W = LilypondWriter(out)
+    >>> W.preamble()
+    >>> W.chart(('a',0), octave=1, max_harmonic=4)
+    >>> print('\\n'.join(out.getvalue().splitlines()[15:19]))
+    numsAab = \\lyricmode
+    {
+      "3"
+      "4"
+
+  """
+
+  def __init__(self, stream):
+    self.stream = stream
+
+  def preamble(self):
+    """
+    Write the version, include, header and ``global`` definitions that begin
+    the document.
+    """
+    self.stream.write(_LILYPOND_PREAMBLE)
+
+  def separator(self, page_break=False):
+    """
+    Write the separator between two charts, and a page break if ``page_break``
+    is True.
+    """
+    write = self.stream.write
+    write('\n\n')
+    write('%'*60)
+    write('\n\n')
+    if page_break:
+      write('\\pageBreak')
+      write('\n\n')
+
+  def chart(self, string, octave=0, max_harmonic=16, clef=None,
+            instrument="cello", note_spacing=200, staff_spacing=10, table=None,
+            nodes=None, intervals=None):
+    """
+    Write the chart of one octave on one string; the arguments are as for
+    ``lilypond_harmonics``.  The nodes and intervals already computed by a
+    ``HarmonicModel`` may be given as ``nodes``, its list of triples
+    ``(h,n,e)`` for the octave, and ``intervals``, its mapping from harmonic
+    number to interval, in which case ``table`` is not used.
+    """
+    string_name, string_octave = string
+    string_num = note_number(string_name)
+    string_name = note_name(string_num, notation=LILYPOND_NOTATION)
+
+    loc_ottava = 0
+    if clef is None:
+      min_note_num = string_num + 12 * (string_octave + octave)
+      if min_note_num <= 2:       # d
+        clef = "bass"
+      elif min_note_num <= 9:     # a
+        clef = "tenor"
+      elif min_note_num <= 23:    # b'
+        clef = "treble"
+      else:
+        clef = "treble"
+        loc_ottava = (min_note_num - 23)//12 + 1
+
+    suff = '{}{}{}'.format(string_name, chr(ord('a')+string_octave), chr(ord('a')+octave))
+    lo, hi = 12*octave+1, 12*octave+12
+    if nodes is not None:
+      nodes_of = _nodes_of_harmonic(nodes).__getitem__
+    elif table is None:
+      nodes_of = lambda h: note_positions_in_range(h, lo, hi)
+    else:
+      nodes_of = lambda h: table.nodes_in_range(h, lo, hi)
+    interval = harmonic_interval if intervals is None else intervals.__getitem__
+    bars = self._bars(string_num, string_octave, octave, max_harmonic, nodes_of, interval)
+    write = self.stream.write
+
+    write('\n')
+    write('nums{} = \\lyricmode\n'.format(suff))
+    write('{')
+    for h, pitch, hoff_str, ottava, locations in bars:
+      write('\n  "{}"'.format(h))
+      write(' ""' * (len(locations) - 1))
+    write('\n}\n')
+
+    write('\n')
+    write('pitches{} =\n'.format(suff))
+    write('{\n')
+    write('  \\global\n')
+    write('  \\clef "treble"\n')
+    for h, pitch, hoff_str, ottava, locations in bars:
+      write('  % {}\n'.format(h))
+      write('  \\bar "|"\n')
+      write('  \\ottava #{}\n'.format(ottava))
+      write('  {} \\harmonic _\\markup{{"{}"}}\n'.format(pitch, hoff_str))
+      write('  {} \\harmonic\n'.format(pitch) * (len(locations) - 1))
+    write('\\bar "|."\n')
+    write('}\n')
+
+    write('\n')
+    write('locations{} =\n'.format(suff))
+    write('{\n')
+    write('  \\global\n')
+    write('  \\clef "{}"\n'.format(clef))
+    write('  \\ottava #{}\n'.format(loc_ottava))
+    for h, pitch, hoff_str, ottava, locations in bars:
+      write('  % {}\n'.format(h))
+      for location in locations:
+        write('  {} _\\markup{{"{}"}}\n'.format(*location))
+    write('}\n')
+
+    write('\n')
+    write(_LILYPOND_SCORE.format(instrument=instrument.title(), string=note_name(string_num),
+                                 octave=ordinal(octave), suff=suff,
+                                 note_spacing=note_spacing, staff_spacing=staff_spacing))
+    write('\n')
+
+  @staticmethod
+  def _bars(string_num, string_octave, octave, max_harmonic, nodes_of, interval):
+    # One bar per harmonic with a node in the octave: the harmonic number, its
+    # pitch, offset and ottava, and the pitch and offset of each fingered note.
+    bars = []
+    for h in range(2,max_harmonic+1):
+      locations = []
+      for n,e in nodes_of(h):
+        note_num = n + string_num
+        note_octave = string_octave
+        q,r = note_num // 12, note_num % 12
+        note_num = r
+        note_octave += q
+        note = note_name(note_num, lower_case=True, notation=LILYPOND_NOTATION)
+        if note_octave >= 0:
+          note_octave_str = "'"*note_octave
+        else:
+          note_octave_str = ","*abs(note_octave)
+        e_sgn = '+' if e>=0 else '-'
+        e_str = e_sgn + str(abs(e))
+        locations.append((note + note_octave_str, e_str))
+      if not locations: continue
+
+      hint,hoct,hoff = interval(h)
+
+      hnote_num = hint + string_num
+      q,r = hnote_num // 12, hnote_num % 12
+      hoct += q + string_octave + octave
+      hnote_num = r
+      hnote = note_name(hnote_num, lower_case=True, notation=LILYPOND_NOTATION)
+
+      if hoct >= 0:
+        hoct_str = "'"*hoct
+      else:
+        hoct_str = ","*abs(hoct)
+
+      hoff_sgn = '+' if hoff>=0 else '-'
+      hoff_str = hoff_sgn + str(abs(hoff))
+
+      if hoct < 1:
+        ottava = -1
+      elif hoct > 2:
+        ottava = min(2,hoct - 2)
+      else:
+        ottava = 0
+
+      bars.append((h, hnote + hoct_str, hoff_str, ottava, locations))
+    return bars
+
+###################################  Output  ###################################
+
 def lilypond_harmonics(filename, string, octave=0, max_harmonic=16,
                        clef=None, instrument="cello",
                        note_spacing=200, staff_spacing=10,
-                       append=False, page_break=False):
+                       append=False, page_break=False, table=None):
   """.
 
   Write lilypond output to engrave a harmonic fingering chart on given string
@@ -538,6 +2703,9 @@ def lilypond_harmonics(filename, string, octave=0, max_harmonic=16,
   - ``page_break`` -- boolean (default: False); whether to insert a page break
     before the output; this is ignored unless ``append`` is True
 
+  - ``table`` -- optional ``HarmonicTable`` for at least ``max_harmonic``
+    harmonics, from which to take the node locations
+
   OUTPUT:
 
   - Writes Lilypond source to the named file.  Subsequent processing by Lilypond
@@ -555,210 +2723,529 @@ def lilypond_harmonics(filename, string, octave=0, max_harmonic=16,
       note where the harmonic node occurs.
 
   """
-  if type(octave) in (list,tuple):
-    kw = {}
-    kw['filename'] = filename
-    kw['string'] = string
-    kw['max_harmonic'] = max_harmonic
-    kw['clef'] = clef
-    kw['instrument'] = instrument
-    kw['note_spacing'] = note_spacing
-    kw['staff_spacing'] = staff_spacing
-    kw['page_break'] = page_break
-    for i,n in enumerate(octave):
-      kw['octave'] = n
-      kw['append'] = i > 0
-      lilypond_harmonics(**kw)
+  if type(octave) not in (list,tuple):
+    octave = [octave]
+  sections = [{'string':string, 'octave':n, 'page_break':page_break} for n in octave]
+  lilypond_document(filename, sections, max_harmonic=max_harmonic, clef=clef,
+                    instrument=instrument, note_spacing=note_spacing,
+                    staff_spacing=staff_spacing, append=append, table=table)
+
+
+###################################  Output  ###################################
+
+def lilypond_document(filename, sections, max_harmonic=16, append=False,
+                      table=None, cache=False, **options):
+  """.
+
+  Write a Lilypond document with harmonic fingering charts for several strings
+  and octaves.
+
+  INPUT:
+
+  - ``filename`` -- name of Lilypond file in which to write the output, or an
+    open text stream
+
+  - ``sections`` -- list of dictionaries, one per chart, each giving the
+    ``string`` and ``octave`` of the chart as for ``lilypond_harmonics``, and
+    optionally ``page_break`` and any of the options below to override them
+    for that chart
+
+  - ``max_harmonic`` -- positive integer (default: 16); largest number harmonic to include
+
+  - ``append`` -- boolean (default: False); whether to append the output to the given file
+
+  - ``table`` -- optional ``HarmonicTable`` for at least ``max_harmonic``
+    harmonics; if not given, one is computed and shared by all the charts if
+    there are several, while a single chart computes only the nodes in its
+    octave
+
+  - ``cache`` -- boolean (default: False); whether to skip rewriting the file if
+    it was last written by this function with the same arguments (see
+    ``build_key``), and to leave it untouched if the new text is the same as
+    the old; this is ignored if ``append`` is True, and requires ``filename``
+    to be a file name rather than a stream
+
+  - ``options`` -- any of the keyword arguments ``clef``, ``instrument``,
+    ``note_spacing`` and ``staff_spacing`` of ``lilypond_harmonics``, applying
+    to every chart
+
+  OUTPUT:
+
+  - Writes Lilypond source to the named file: the preamble once, followed by
+    the charts in the order given, separated as by ``lilypond_harmonics`` with
+    ``append`` True.  The file is opened once, and the nodes of all harmonics
+    are computed at most once for the whole document.
+
+  """
+  if cache and not append:
+    if not isinstance(filename, str):
+      raise ValueError('cannot cache output written to a stream')
+    notation = current_notation()
+    key = build_key(function='lilypond_document', sections=sections,
+                    max_harmonic=max_harmonic, options=options,
+                    notation=[notation.flat, notation.sharp])
+    if is_built(filename, key):
+      return
+    F = io.StringIO()
+    lilypond_document(F, sections, max_harmonic, table=table, **options)
+    text = F.getvalue()
+    if _file_hash(filename) != _text_hash(text):
+      with open(filename, 'w') as F:
+        F.write(text)
+    record_build(filename, key)
     return
 
-  string_name, string_octave = string
-  string_num = note_number(string_name)
-  string_name = note_name(string_num)
-
-  loc_ottava = 0
-  if clef is None:
-    min_note_num = string_num + 12 * (string_octave + octave)
-    if min_note_num <= 2:       # d
-      clef = "bass"
-    elif min_note_num <= 9:     # a
-      clef = "tenor"
-    elif min_note_num <= 23:    # b'
-      clef = "treble"
-    else:
-      clef = "treble"
-      loc_ottava = (min_note_num - 23)//12 + 1
+  if table is None and len(sections) > 1:
+    table = HarmonicTable(max_harmonic)
+  if isinstance(filename, str):
+    F = open(filename, 'a' if append else 'w')
+  else:
+    F = nullcontext(filename)
+  with F as stream:
+    writer = LilypondWriter(stream)
+    if append:
+      writer.separator(sections[0].get('page_break', False) if sections else False)
+    writer.preamble()
+    for i,section in enumerate(sections):
+      kw = dict(options)
+      kw.update(section)
+      page_break = kw.pop('page_break', False)
+      if i > 0:
+        writer.separator(page_break)
+      writer.chart(max_harmonic=max_harmonic, table=table, **kw)
 
 
-  line = lambda s: s + '\n'
+###################################  Output  ###################################
 
-  
-  suff = '{}{}{}'.format(string_name, chr(ord('a')+string_octave), chr(ord('a')+octave))
-
-  pre = ''
-  pre += line('\\' + 'version "2.20.0"')
-  pre += line('\\include "english.ly"')
-  pre += line('  \\header')
-  pre += line('  {')
-  pre += line('    copyright = "All rights to this work are waived under Creative Commons Licens CC0.  See https://creativecommons.org/publicdomain/zero/1.0/"')
-  pre += line('    tagline = ##f')
-  pre += line('    print-all-headers = ##t')
-  pre += line('  }')
-  pre += line('#(set-default-paper-size "letter")')
-  pre += line('global = ')
-  pre += line('{')
-  pre += line('  \\omit Score.TimeSignature')
-  pre += line('  \\cadenzaOn')
-  pre += line('}')
-
-  post = ''
-  post += line('\\score')
-  post += line('{')
-  post += line('  \\header')
-  post += line('  {')
-  post += line('    tagline = ##f')
-  post += line('    piece = \\markup \\column {{ "{} {}-string, {} octave" \\vspace #1 }}'.format(instrument.title(), string_name, ordinal(octave)))
-  post += line('  }')
-  post += line('  \\new StaffGroup')
-  post += line('  <<')
-  post += line('    \\new Staff = "pitch" \\with { instrumentName = "pitch" }')
-  post += line('    <<')
-  post += line('      \\new Voice = "pitch" {{ \\pitches{} }}'.format(suff))
-  post += line('    >>')
-  post += line('    \\new Staff = "location" \\with { instrumentName = "location" }')
-  post += line('    << \\locations{} >>'.format(suff))
-  post += line('    \\new Lyrics \\with { alignAboveContext = "pitch" }')
-  post += line('    {')
-  post += line('      \\lyricsto "pitch" \\nums{}'.format(suff))
-  post += line('    }')
-  post += line('  >>')
-  post += line('}')
-  post += line('')
-  post += line('\\layout')
-  post += line('{')
-  post += line('  \\context {')
-  post += line('    \\StaffGroup')
-  post += line('    \\consists #Span_stem_engraver')
-  post += line('  }')
-  post += line('  \\context {')
-  post += line('    \\Score')
-  post += line('    \\override SpacingSpanner.base-shortest-duration = #(ly:make-moment 1/{})'.format(note_spacing))
-  post += line('  }')
-  post += line('}')
-  post += line('  ')
-  post += line('\\paper')
-  post += line('{')
-  post += line('  system-system-spacing = #\'((basic-distance . 1) (padding . {}))'.format(staff_spacing))
-  post += line('  top-margin = 25')
-  post += line('  left-margin = 25')
-  post += line('  right-margin = 25')
-  post += line('  ragged-bottom = ##t')
-  post += line('  print-page-number = ##f')
-  post += line('}')
-
-  nums = line('nums{} = \\lyricmode'.format(suff))
-  nums += '{'
-
-  pitches = line('pitches{} ='.format(suff))
-  pitches += line('{')
-  pitches += line('  \\global')
-  pitches += line('  \\clef "treble"')
-
-  locations = line('locations{} ='.format(suff))
-  locations += line('{')
-  locations += line('  \\global')
-  locations += line('  \\clef "{}"'.format(clef))
-  locations += line('  \\ottava #{}'.format(loc_ottava))
+class HarmonicModel:
+  """.
+  The harmonics of one string, computed once for rendering in several formats.
 
-  for h in range(2,max_harmonic+1):
-    hint,hoct,hoff = harmonic_interval(h)
+  INPUT:
 
-    hnote_num = hint + string_num
-    q,r = hnote_num // 12, hnote_num % 12
-    hoct += q + string_octave + octave
-    hnote_num = r
-    hnote = note_name(hnote_num, lower_case=True)
+  - ``string`` -- note name of an open string, or pair ``(name,octave)`` as for
+    ``lilypond_harmonics``; the Lilypond octave is 0 if not given.  A model
+    without a string can be computed and then bound to strings with
+    ``for_string``.
 
-    if hoct >= 0:
-      hoct_str = "'"*hoct
-    else:
-      hoct_str = ","*abs(hoct)
-
-    hoff_sgn = '+' if hoff>=0 else '-'
-    hoff_str = hoff_sgn + str(abs(hoff))
-
-    first = True
-
-    for n,e in note_positions_near_harmonic(h):
-      if floor((n-1)/12) != octave: continue
-      note_num = n + string_num
-      note_octave = string_octave
-      q,r = note_num // 12, note_num % 12
-      note_num = r
-      note_octave += q
-      note = note_name(note_num, lower_case=True)
-      if note_octave >= 0:
-        note_octave_str = "'"*note_octave
-      else:
-        note_octave_str = ","*abs(note_octave)
-      e_sgn = '+' if e>=0 else '-'
-      e_str = e_sgn + str(abs(e))
+  - ``octaves`` -- list of integers (default: [0]); which octaves to show (0
+    means first octave)
 
-      if first:
-        first = False
+  - ``max_harmonic`` -- positive integer (default: 16); largest harmonic number
+    to include
 
-        nums += '\n  "{}"'.format(h)
+  - ``table`` -- optional ``HarmonicTable`` for exactly ``max_harmonic``
+    harmonics; if not given, one is computed
 
-        pitches += line('  % {}'.format(h))
-        pitches += line('  \\bar "|"')
-        if hoct < 1:
-          ottava = -1
-        elif hoct > 2:
-          ottava = min(2,hoct - 2)
-        else:
-          ottava = 0
-        pitches += line('  \\ottava #{}'.format(ottava))
-        pitches += line('  {}{} \\harmonic _\\markup{{"{}"}}'.format(hnote, hoct_str, hoff_str))
+  The model holds the ``table`` of nodes, the ``intervals`` of the harmonics as
+  given by ``harmonic_interval``, and for each octave ``o`` the list
+  ``nodes[o]`` of triples ``(h,n,e)`` of harmonic number, fingered note and
+  offset for the nodes in that octave, in order of harmonic, and the list
+  ``positions[o]`` of triples ``(n,e,h)`` of the same nodes in order of
+  position.  Use ``render`` to produce output from it; every renderer works
+  from these, so nothing is recomputed per format or per string.
 
-        locations += line('  % {}'.format(h))
-        locations += line('  {}{} _\\markup{{"{}"}}'.format(note, note_octave_str, e_str))
+  EXAMPLES:
 
-      else:
-        nums += ' ""'
-        pitches += line('  {}{} \\harmonic'.format(hnote, hoct_str))
-        locations += line('  {}{} _\\markup{{"{}"}}'.format(note, note_octave_str, e_str))
-
-  nums += line('\n}')
-  pitches += line('\\bar "|."')
-  pitches += line('}')
-  locations += line('}')
-
-  if append:
-    F = open(filename,'a')
-    F.write('\n\n')
-    F.write('%'*60)
-    F.write('\n\n')
-    if page_break:
-      F.write('\\pageBreak')
-      F.write('\n\n')
+    >>> M = HarmonicModel('A', octaves=(1,), max_harmonic=5)
+    >>> M.nodes[1]
+    [(3, 19, 2), (4, 24, 0), (5, 16, -14)]
+    >>> print(render(M, 'csv'), end='')
+    string,octave,harmonic,sounding_note,sounding_octave,sounding_offset,fingered_note,fingered_offset
+    A,1,3,E,1,2,E,2
+    A,1,4,A,2,0,A,0
+    A,1,5,Cs,2,-14,Cs,-14
+
+  """
+
+  def __init__(self, string=None, octaves=(0,), max_harmonic=16, table=None):
+    self._set_string(string)
+    self.octaves = list(octaves)
+    self.max_harmonic = max_harmonic
+    if table is None:
+      table = HarmonicTable(max_harmonic)
+    elif table.max_harmonic != max_harmonic:
+      raise ValueError('table is for harmonics up to {}, not {}'.format(table.max_harmonic, max_harmonic))
+    self.table = table
+    self.intervals = {h:harmonic_interval(h) for h in range(2, max_harmonic+1)}
+    self.nodes = {}
+    self.positions = {}
+    for o in self.octaves:
+      rows = []
+      for h in range(2, max_harmonic+1):
+        i, j = table._span_in_range(h, 12*o+1, 12*o+12)
+        rows.extend(range(i, j))
+      hs, ms, ns, es = table.harmonics, table.numerators, table.semitones, table.cents
+      self.nodes[o] = [(hs[i], ns[i], es[i]) for i in rows]
+      # node m/h lies further from the nut the smaller m/h is
+      rows.sort(key=lambda i: -ms[i]/hs[i])
+      self.positions[o] = [(ns[i], es[i], hs[i]) for i in rows]
+
+  def _set_string(self, string):
+    if string is None:
+      self.string = self.string_num = self.string_octave = None
+      return
+    if isinstance(string, str):
+      string = (string, 0)
+    self.string_num = note_number(string[0])
+    self.string = note_name(self.string_num)
+    self.string_octave = string[1]
+
+  def for_string(self, string):
+    """
+    Return a model of the same harmonics on the open string ``string``.  Only
+    the string differs; the table, intervals, nodes and positions, which do
+    not depend on the string, are shared with this model rather than
+    recomputed.
+    """
+    model = copy(self)
+    model._set_string(string)
+    return model
+
+  def names(self):
+    """
+    Return the list of names of the 12 notes from the open string up.
+    """
+    return [note_name(self.string_num + k) for k in range(12)]
+
+  def rows(self):
+    """
+    Generate one tuple per node shown, giving the open string, octave,
+    harmonic number, sounding note, octaves up and offset of the harmonic, and
+    fingered note and offset of the node.
+    """
+    names = self.names()
+    for o in self.octaves:
+      for h,n,e in self.nodes[o]:
+        hint,hoct,hoff = self.intervals[h]
+        yield self.string, o, h, names[hint], hoct, hoff, names[n % 12], e
+
+
+def _nodes_of_harmonic(nodes):
+  # map each harmonic number to the list of pairs (n,e) of its nodes among the
+  # triples (h,n,e) of a HarmonicModel octave; harmonics without nodes map to
+  # an empty list
+  groups = defaultdict(list)
+  for h,n,e in nodes:
+    groups[h].append((n,e))
+  return groups
+
+
+renderers = {}
+
+def register_renderer(name):
+  """
+  Decorator registering a function ``f(model, file)``, which writes a
+  ``HarmonicModel`` to a text stream, as the renderer named ``name``.
+  """
+  def register(f):
+    renderers[name] = f
+    return f
+  return register
+
+
+def render(model, name, file=None):
+  """
+  Render the ``HarmonicModel`` ``model`` with the renderer named ``name`` (one
+  of the keys of ``renderers``), writing to the text stream ``file`` if given,
+  and otherwise returning the output as a string.
+  """
+  try:
+    renderer = renderers[name]
+  except KeyError:
+    raise ValueError('unknown renderer {}'.format(name))
+  if model.string is None:
+    raise ValueError('model has no string; use for_string to choose one')
+  if file is not None:
+    renderer(model, file)
+    return
+  out = io.StringIO()
+  renderer(model, out)
+  return out.getvalue()
+
+
+def render_strings(strings, name, octaves=(0,), max_harmonic=16, file=None):
+  """.
+  Render the harmonics on several open strings with one computation.
+
+  INPUT:
+
+  - ``strings`` -- list of open strings, each as for ``HarmonicModel``; for
+    instance all strings of an instrument, or ``[note_name(k) for k in
+    range(12)]`` for all transpositions
+
+  - ``name`` -- the name of a renderer, as for ``render``
+
+  - ``octaves``, ``max_harmonic`` -- as for ``HarmonicModel``
+
+  - ``file`` -- optional text stream to write to
+
+  OUTPUT:
+
+  - the output of the renderer for each string in turn, written to ``file``
+    if given and otherwise returned as a string.  Lilypond output is a single
+    document with a chart for each string and octave, CSV output a single
+    table with one header, and JSON output a single array; the ``string``
+    field tells the rows of each string apart.
+
+  The nodes and intervals are computed once, since they do not depend on the
+  string; only the note names are computed per string.
+
+  EXAMPLES:
+
+    >>> out = render_strings(['C', 'G'], 'csv', octaves=(1,), max_harmonic=3)
+    >>> print(out, end='')
+    string,octave,harmonic,sounding_note,sounding_octave,sounding_offset,fingered_note,fingered_offset
+    C,1,3,G,1,2,G,2
+    G,1,3,D,1,2,D,2
+
+  """
+  model = HarmonicModel(None, octaves, max_harmonic)
+  out = io.StringIO() if file is None else file
+  if name == 'lilypond':
+    _lilypond_models([model.for_string(string) for string in strings], out)
+  elif name in ('csv', 'json'):
+    rows = (row for string in strings for row in model.for_string(string).rows())
+    (_write_csv if name == 'csv' else _write_json)(rows, out)
+  else:
+    for string in strings:
+      render(model.for_string(string), name, out)
+  if file is None:
+    return out.getvalue()
+
+
+@register_renderer('table')
+def _render_table(model, file):
+  names = model.names()
+  for o in model.octaves:
+    nodes_of = _nodes_of_harmonic(model.nodes[o]).__getitem__
+    file.writelines(line + '\n' for line in
+                    _harmonics_lines(names, o, model.max_harmonic, nodes_of,
+                                     model.intervals.__getitem__))
+
+@register_renderer('by_position')
+def _render_by_position(model, file):
+  rows = ((o, model.positions[o]) for o in model.octaves)
+  file.writelines(line + '\n' for line in
+                  _by_position_lines(model.names(), model.max_harmonic, rows,
+                                     model.intervals.__getitem__))
+
+@register_renderer('lilypond')
+def _render_lilypond(model, file):
+  _lilypond_models([model], file)
+
+def _lilypond_models(models, file):
+  # one document with a chart for each octave of each model, laid out as by
+  # lilypond_document
+  writer = LilypondWriter(file)
+  writer.preamble()
+  first = True
+  for model in models:
+    for o in model.octaves:
+      if not first:
+        writer.separator()
+      first = False
+      writer.chart((model.string, model.string_octave), o, model.max_harmonic,
+                   nodes=model.nodes[o], intervals=model.intervals)
+
+_ROW_FIELDS = ('string', 'octave', 'harmonic', 'sounding_note', 'sounding_octave',
+               'sounding_offset', 'fingered_note', 'fingered_offset')
+
+@register_renderer('csv')
+def _render_csv(model, file):
+  _write_csv(model.rows(), file)
+
+@register_renderer('json')
+def _render_json(model, file):
+  _write_json(model.rows(), file)
+
+def _write_csv(rows, file):
+  writer = csv.writer(file, lineterminator='\n')
+  writer.writerow(_ROW_FIELDS)
+  writer.writerows(rows)
+
+def _write_json(rows, file):
+  json.dump([dict(zip(_ROW_FIELDS, row)) for row in rows], file, indent=1)
+  file.write('\n')
+
+
+###################################  Output  ###################################
+
+def compile_lilypond(filenames, jobs=None, timeout=600, cache=False, batch=False):
+  """.
+
+  Run Lilypond on several files concurrently.
+
+  INPUT:
+
+  - ``filenames`` -- list of names of Lilypond files, each ending in ".ly"
+
+  - ``jobs`` -- optional positive integer; the largest number of Lilypond
+    processes to run at once; by default, the number of processors
+
+  - ``timeout`` -- number (default: 600); seconds to allow each file
+
+  - ``cache`` -- boolean (default: False); whether to skip files whose PDF was
+    last compiled by this function from the same Lilypond source
+
+  - ``batch`` -- boolean (default: False); whether to compile several files in
+    each Lilypond process, so as to pay its startup time (loading Guile and
+    fonts) once per process rather than once per file.  The files are divided
+    into at most ``jobs`` batches per directory.
+
+  OUTPUT:
+
+  - the list of names of the PDF files produced, one per input file, each the
+    input file name with ".pdf" in place of ".ly".  The output of Lilypond for
+    each file is written to the file name with ".log" in place of ".ly".
+
+  If Lilypond fails or times out on any file, the files not yet started are
+  abandoned, the ones running are stopped, and a ``RuntimeError`` is raised
+  naming the file and its log.  In a batch, a file has failed if its PDF was
+  not produced.  Each Lilypond process runs in a session of its own, so that
+  stopping it also stops any programs it started, such as Ghostscript.
+
+  """
+  import subprocess
+  from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+  if jobs is None:
+    jobs = os.cpu_count() or 1
+  bases = [f[:-3] if f.endswith('.ly') else f for f in filenames]
+  keys = {}
+  todo = bases
+  if cache:
+    for base in bases:
+      keys[base] = build_key(function='compile_lilypond', source=_file_hash(base+'.ly'))
+    todo = [base for base in bases if not is_built(base+'.pdf', keys[base])]
+  if batch:
+    groups = []
+    by_dir = {}
+    for base in todo:
+      by_dir.setdefault(os.path.dirname(base), []).append(base)
+    for group in by_dir.values():
+      n = min(jobs, len(group))
+      groups.extend(group[i::n] for i in range(n))
+  else:
+    groups = [[base] for base in todo]
+  running = {}
+  failed = []
+
+  def compile_group(group):
+    if failed:
+      return
+    for base in group:
+      if os.path.exists(base+'.pdf'):
+        os.remove(base+'.pdf')
+    if len(group) == 1:
+      args = ['-o', group[0], group[0]+'.ly']
+    else:
+      args = ['-o', os.path.dirname(group[0]) or '.'] + [base+'.ly' for base in group]
+    P = subprocess.Popen([lilypond_command] + args, stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT, universal_newlines=True,
+                         start_new_session=True)
+    running[id(group)] = P
+    try:
+      output = P.communicate(timeout=timeout*len(group))[0]
+    except subprocess.TimeoutExpired:
+      _stop_process(P, kill=True)
+      try:
+        output = P.communicate(timeout=5)[0]
+      except subprocess.TimeoutExpired:
+        output = ''
+      _write_lilypond_logs(group, output)
+      failed.append(group)
+      raise RuntimeError('lilypond timed out on {}.ly; see {}.log'.format(group[0], group[0]))
+    finally:
+      del running[id(group)]
+    _write_lilypond_logs(group, output)
+    if failed:
+      return
+    bad = []
+    for base in group:
+      if P.returncode != 0 and not os.path.exists(base+'.pdf'):
+        bad.append(base)
+      elif cache:
+        record_build(base+'.pdf', keys[base])
+    if P.returncode != 0 and not bad:
+      bad = group
+    if bad:
+      failed.append(bad)
+      raise RuntimeError('lilypond failed on {}; see {}'.format(
+        ', '.join(b+'.ly' for b in bad), ', '.join(b+'.log' for b in bad)))
+
+  with ThreadPoolExecutor(max_workers=jobs) as pool:
+    futures = [pool.submit(compile_group, group) for group in groups]
+    done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+    if pending:
+      for future in pending:
+        future.cancel()
+      for P in list(running.values()):
+        _stop_process(P)
+    for future in futures:
+      if future.done() and not future.cancelled() and future.exception():
+        raise future.exception()
+  return [base+'.pdf' for base in bases]
+
+
+def _stop_process(P, kill=False):
+  # stop the process P and, where process groups exist, every process in its
+  # session, which may hold its output pipe open
+  if hasattr(os, 'killpg'):
+    import signal
+    try:
+      os.killpg(P.pid, signal.SIGKILL if kill else signal.SIGTERM)
+    except ProcessLookupError:
+      pass
+  elif kill:
+    P.kill()
   else:
-    F = open(filename,'w')
-  F.write(pre)
-  F.write('\n')
-  F.write(nums)
-  F.write('\n')
-  F.write(pitches)
-  F.write('\n')
-  F.write(locations)
-  F.write('\n')
-  F.write(post)
-  F.write('\n')
+    P.terminate()
+
+
+def _write_lilypond_logs(group, output):
+  # Lilypond starts the output for each input file with "Processing `name.ly'"
+  logs = {base:[] for base in group}
+  names = {os.path.basename(base)+'.ly':base for base in group}
+  current = group[0]
+  for line in output.splitlines(True):
+    if line.startswith('Processing'):
+      name = os.path.basename(line.split(None, 1)[-1].strip().strip('`\'"'))
+      current = names.get(name, current)
+    logs[current].append(line)
+  for base, lines in logs.items():
+    with open(base+'.log', 'w') as log:
+      log.writelines(lines)
+
+
+###################################  Output  ###################################
+
+def merge_pdfs(filenames, output, cache=False):
+  """
+  Concatenate the PDF files ``filenames`` into the PDF file ``output`` using
+  pdftk, raising a ``RuntimeError`` if it fails.  If ``cache`` is True, this is
+  skipped when ``output`` was last made by this function from the same PDF
+  files.
+  """
+  import subprocess
+
+  if cache:
+    key = build_key(function='merge_pdfs', sources=[_file_hash(f) for f in filenames])
+    if is_built(output, key):
+      return
 
-  F.close()
+  args = [pdftk_command] + list(filenames) + ['cat', 'output', output]
+  result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          universal_newlines=True)
+  if result.returncode != 0:
+    raise RuntimeError('pdftk failed on {}: {}'.format(output, result.stdout.strip()))
+  if cache:
+    record_build(output, key)
 
 
 ###################################  Output  ###################################
 
-def lilypond_cello_strings(filename_base):
+def lilypond_cello_strings(filename_base, cache=True, batch=False):
   """
   Produce a PDF fingering chart of harmonics on cello, for first 3 octaves on
   all strings.
@@ -772,48 +3259,40 @@ def lilypond_cello_strings(filename_base):
 
   - ``filename_base`` -- base of the filenames to use
 
+  - ``cache`` -- boolean (default: True); whether to skip rewriting Lilypond
+    files, recompiling PDF files, and merging, when their inputs have not
+    changed since they were last made
+
+  - ``batch`` -- boolean (default: False); whether to compile the Lilypond files
+    in a single Lilypond process (see ``compile_lilypond``)
+
   OUTPUT:
 
   - produces a pdf file whose name is filename_base with ".pdf" appended;
-    intermediate output is in other files with names starting with filename_base
+    intermediate output is in other files with names starting with filename_base.
+    The Lilypond files are compiled concurrently by ``compile_lilypond``, and
+    the PDF files merged only once all have been produced.
 
   """
-  import os
-
   file0 = filename_base+'_tmp0'
   file1 = filename_base+'_tmp1'
   file2 = filename_base+'_tmp2'
 
-  def process(f,s,o,a,b,**kwargs):
-    lilypond_harmonics(f+'.ly',s,octave=o,append=a,page_break=b,**kwargs)
-
-  s = ('a',0)
-  process(file0,s,0,False,False)
-  process(file0,s,1,True,True)
-  process(file0,s,2,True,False)
+  def sections(s):
+    return [{'string':s, 'octave':0},
+            {'string':s, 'octave':1, 'page_break':True},
+            {'string':s, 'octave':2}]
 
-  s = ('d',0)
-  process(file0,s,0,True,False)
-  process(file0,s,1,True,True)
-  process(file0,s,2,True,False)
-
-  s = ('g',-1)
-  process(file0,s,0,True,False)
-  process(file0,s,1,True,True)
-  process(file0,s,2,True,False)
+  lilypond_document(file0+'.ly', sections(('a',0)) + sections(('d',0)) + sections(('g',-1)),
+                    cache=cache)
 
   s = ('c',-1)
-  process(file1,s,0,False,False,note_spacing=100)
-  process(file2,s,1,False,True)
-  process(file2,s,2,True,False)
-
-  os.system('lilypond {}'.format(file0))
-  os.system('lilypond {}'.format(file1))
-  os.system('lilypond {}'.format(file2))
-  pdf0 = file0+'.pdf'
-  pdf1 = file1+'.pdf'
-  pdf2 = file2+'.pdf'
-  os.system('pdftk A={} B={} C={} cat A B C output {}'.format(pdf0,pdf1,pdf2,filename_base+'.pdf'))
+  lilypond_document(file1+'.ly', sections(s)[:1], note_spacing=100, cache=cache)
+  lilypond_document(file2+'.ly', sections(s)[1:], cache=cache)
+
+  pdfs = compile_lilypond([file0+'.ly', file1+'.ly', file2+'.ly'], cache=cache,
+                          jobs=1 if batch else None, batch=batch)
+  merge_pdfs(pdfs, filename_base+'.pdf', cache=cache)
 
 
 